@@ -0,0 +1,262 @@
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+import database
+
+# Paths ending with this suffix (or existing directories) are treated as columnar logs
+LOG_SUFFIX = '.alog'
+MANIFEST_FILE = 'manifest.json'
+DATE_COLUMNS = {'Date'}
+
+class ActivityLog:
+    """Append-only, segment-based columnar store for activity records.
+
+    Every append writes one segment directory holding a .npy file per column.
+    Dates are stored as datetime64, numbers keep their dtype and text columns
+    are dictionary-encoded against a per-column dictionary kept in the manifest.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        manifest_path = os.path.join(self.path, MANIFEST_FILE)
+        if os.path.isfile(manifest_path):
+            with open(manifest_path, 'r') as f:
+                return json.load(f)
+        return {'columns': [], 'kinds': {}, 'dictionaries': {}, 'segments': [], 'next_segment': 1}
+
+    def _save_manifest(self):
+        manifest_path = os.path.join(self.path, MANIFEST_FILE)
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, manifest_path)
+
+    def _new_segment_name(self):
+        """A segment name never used before in this log; compaction leaves gaps, so it is counted in the manifest."""
+        # Manifests written before the counter start after their highest segment
+        number = self.manifest.get('next_segment') or max(
+            (int(segment['name'].split('-')[1]) for segment in self.manifest['segments']), default=0) + 1
+        self.manifest['next_segment'] = number + 1
+        return f"seg-{number:06d}"
+
+    def __len__(self):
+        return sum(segment['rows'] for segment in self.manifest['segments'])
+
+    @property
+    def columns(self):
+        return list(self.manifest['columns'])
+
+    @staticmethod
+    def _kind(values, col):
+        if col in DATE_COLUMNS or pd.api.types.is_datetime64_any_dtype(values):
+            return 'date'
+        if pd.api.types.is_bool_dtype(values) or pd.api.types.is_integer_dtype(values):
+            return 'int'
+        if pd.api.types.is_float_dtype(values):
+            return 'float'
+        return 'category'
+
+    def _infer_schema(self, df):
+        kinds = {col: self._kind(df[col], col) for col in df.columns}
+        self.manifest['columns'] = list(df.columns)
+        self.manifest['kinds'] = kinds
+        self.manifest['dictionaries'] = {col: [] for col, kind in kinds.items() if kind == 'category'}
+
+    def _segment_file(self, segment, col):
+        return os.path.join(self.path, segment['name'], f"c{self.manifest['columns'].index(col)}.npy")
+
+    def _save_array(self, path, values):
+        tmp_path = path + '.tmp.npy'
+        np.save(tmp_path, values)
+        os.replace(tmp_path, path)
+
+    def _widen_column(self, col):
+        """Store an int column as float from now on, converting the segments already written."""
+        for segment in self.manifest['segments']:
+            path = self._segment_file(segment, col)
+            self._save_array(path, np.load(path).astype(np.float64))
+        self.manifest['kinds'][col] = 'float'
+
+    def _add_column(self, col, kind):
+        """Add a column to the schema, missing (NaN, NaT or no category) in the segments already written."""
+        if kind == 'int' and self.manifest['segments']:
+            kind = 'float'  # Earlier rows have no value
+        self.manifest['columns'].append(col)
+        self.manifest['kinds'][col] = kind
+        if kind == 'category':
+            self.manifest['dictionaries'][col] = []
+        fill = {'date': (np.datetime64('NaT'), 'datetime64[ns]'), 'category': (-1, np.int32),
+                'float': (np.nan, np.float64), 'int': (0, np.int64)}[kind]
+        for segment in self.manifest['segments']:
+            self._save_array(self._segment_file(segment, col), np.full(segment['rows'], fill[0], dtype=fill[1]))
+
+    def _evolve_schema(self, df):
+        """Make the schema hold every value of df: new columns are added, int columns that
+        receive fractions or gaps become float. Values that are not numbers raise ValueError
+        before anything is changed."""
+        numbers = {}
+        for col in df.columns:
+            if self.manifest['kinds'].get(col) in ('int', 'float'):
+                try:
+                    numbers[col] = pd.to_numeric(df[col])
+                except (ValueError, TypeError):
+                    raise ValueError(f"Column '{col}' holds numbers, got non-numeric values.") from None
+        for col in df.columns:
+            kind = self.manifest['kinds'].get(col)
+            if kind is None:
+                self._add_column(col, self._kind(df[col], col))
+            elif kind == 'int' and not (numbers[col].notna().all() and (numbers[col] == np.floor(numbers[col])).all()):
+                self._widen_column(col)
+
+    def _encode(self, values, col):
+        kind = self.manifest['kinds'][col]
+        if kind == 'date':
+            return pd.to_datetime(values, errors='coerce').to_numpy(dtype='datetime64[ns]')
+        if kind == 'int':
+            return pd.to_numeric(values).to_numpy(dtype=np.int64)
+        if kind == 'float':
+            return pd.to_numeric(values).to_numpy(dtype=np.float64)
+
+        # Dictionary-encode text, appending unseen values so existing codes stay valid
+        dictionary = self.manifest['dictionaries'][col]
+        text = values.astype('string')
+        known = set(dictionary)
+        dictionary.extend(value for value in pd.unique(text.dropna()) if value not in known)
+        return pd.Categorical(text, categories=dictionary).codes.astype(np.int32)
+
+    def append(self, df):
+        """Write the frame as a new segment and publish it in the manifest."""
+        if df.empty:
+            return 0
+        if not self.manifest['columns']:
+            self._infer_schema(df)
+        else:
+            self._evolve_schema(df)
+        missing = set(self.manifest['columns']) - set(df.columns)
+        if missing:
+            raise ValueError(f"Columns are missing: {missing}")
+
+        os.makedirs(self.path, exist_ok=True)
+        name = self._new_segment_name()
+        tmp_dir = os.path.join(self.path, name + '.tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        for i, col in enumerate(self.manifest['columns']):
+            np.save(os.path.join(tmp_dir, f'c{i}.npy'), self._encode(df[col].reset_index(drop=True), col))
+        os.replace(tmp_dir, os.path.join(self.path, name))
+
+        self.manifest['segments'].append({'name': name, 'rows': len(df)})
+        self._save_manifest()
+        return len(df)
+
+    def replace_column(self, col, values):
+        """Overwrite one column in every segment; the schema widens as it does for an append."""
+        values = pd.Series(values).reset_index(drop=True)
+        if len(values) != len(self):
+            raise ValueError(f"Column '{col}' needs {len(self)} values, got {len(values)}.")
+        self._evolve_schema(values.to_frame(col))
+        start = 0
+        for segment in self.manifest['segments']:
+            stop = start + segment['rows']
+            self._save_array(self._segment_file(segment, col), self._encode(values.iloc[start:stop], col))
+            start = stop
+        self._save_manifest()
+
+    def read_column(self, col, mmap=True):
+        """Return the raw stored array for one column across all segments."""
+        i = self.manifest['columns'].index(col)
+        arrays = [np.load(os.path.join(self.path, segment['name'], f'c{i}.npy'),
+                          mmap_mode='r' if mmap else None)
+                  for segment in self.manifest['segments']]
+        if not arrays:
+            return np.array([])
+        return arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+
+    def read(self, columns=None, mmap=True, start_row=0):
+        """Load only the requested columns, decoding dictionaries to categoricals."""
+        columns = self.columns if columns is None else list(columns)
+        data = {}
+        for col in columns:
+            values = self.read_column(col, mmap=mmap)[start_row:]
+            kind = self.manifest['kinds'][col]
+            if kind == 'category':
+                data[col] = pd.Categorical.from_codes(np.asarray(values), categories=self.manifest['dictionaries'][col])
+            else:
+                data[col] = values
+        return pd.DataFrame(data, columns=columns, copy=False)
+
+    def iter_chunks(self, chunksize, columns=None):
+        """Yield the log as frames of at most chunksize rows, reading through mmap."""
+        columns = self.columns if columns is None else list(columns)
+        arrays = {col: self.read_column(col) for col in columns}
+        for start in range(0, len(self), chunksize):
+            data = {}
+            for col in columns:
+                values = np.asarray(arrays[col][start:start + chunksize])
+                if self.manifest['kinds'][col] == 'category':
+                    values = pd.Categorical.from_codes(values, categories=self.manifest['dictionaries'][col])
+                data[col] = values
+            yield pd.DataFrame(data, columns=columns)
+
+    def compact(self):
+        """Merge all segments into one so readers map a single file per column."""
+        if len(self.manifest['segments']) < 2:
+            return
+        name = self._new_segment_name()
+        tmp_dir = os.path.join(self.path, name + '.tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        for i, col in enumerate(self.manifest['columns']):
+            np.save(os.path.join(tmp_dir, f'c{i}.npy'), self.read_column(col, mmap=False))
+        os.replace(tmp_dir, os.path.join(self.path, name))
+
+        old_segments = self.manifest['segments']
+        self.manifest['segments'] = [{'name': name, 'rows': len(self)}]
+        self._save_manifest()
+        for segment in old_segments:
+            shutil.rmtree(os.path.join(self.path, segment['name']), ignore_errors=True)
+
+def is_activity_log(path):
+    return path.endswith(LOG_SUFFIX) or os.path.isdir(path)
+
+def table_exists(path):
+    if database.is_database_path(path):
+        return database.table_exists(path)
+    if is_activity_log(path):
+        return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+    return os.path.isfile(path)
+
+def read_table(path, columns=None):
+    """Read activity data from a CSV file, a columnar activity log or a database table ('laundry.db#activities')."""
+    if database.is_database_path(path):
+        return database.read_table(path, columns)
+    if is_activity_log(path):
+        return ActivityLog(path).read(columns)
+    return pd.read_csv(path, usecols=columns)
+
+def write_table(df, path, append=True):
+    """Append to (or replace) a CSV file, a columnar activity log or a database table."""
+    if database.is_database_path(path):
+        database.write_table(df, path, append)
+        return
+    if is_activity_log(path):
+        if not append and os.path.isdir(path):
+            shutil.rmtree(path)
+        ActivityLog(path).append(df)
+        return
+    file_exists = os.path.isfile(path)
+    df.to_csv(path, mode='a' if append else 'w', index=False, header=not (append and file_exists))
+
+if __name__ == "__main__":
+    # Convert an existing CSV into a columnar log: python activity_store.py input.csv output.alog
+    if len(sys.argv) != 3:
+        print("Usage: python activity_store.py <input.csv> <output.alog>")
+    else:
+        write_table(pd.read_csv(sys.argv[1]), sys.argv[2], append=False)
+        print(f"Converted {sys.argv[1]} to {sys.argv[2]}")
@@ -0,0 +1,94 @@
+import time
+
+import matplotlib.pyplot as plt
+import pandas as pd
+import seaborn as sns
+
+# Chart drawing only: pool workers import this module, so it stays clear of the model and forecasting code
+
+def render_chart(plot, args, kwargs):
+    """Draw one chart to its file without showing it (in-process or in a pool worker); returns its path and render time."""
+    started = time.perf_counter()
+    path = plot(*args, show=False, **kwargs)
+    return path, time.perf_counter() - started
+
+def use_agg_backend():
+    plt.switch_backend('Agg')
+
+def finish_figure(filename, show=True):
+    """Save the current figure, show it when interactive and always release it."""
+    fig = plt.gcf()
+    fig.savefig(filename)
+    if show:
+        plt.show()
+    plt.close(fig)
+    return filename
+
+def show_chart_file(filename):
+    """Display a chart that is already rendered to PNG, without drawing it again."""
+    image = plt.imread(filename)
+    dpi = plt.rcParams['savefig.dpi'] if plt.rcParams['savefig.dpi'] != 'figure' else plt.rcParams['figure.dpi']
+    fig = plt.figure(figsize=(image.shape[1] / dpi, image.shape[0] / dpi))
+    fig.figimage(image)
+    plt.show()
+    plt.close(fig)
+
+def plot_total_amount_over_time(df_grouped, period, filename='total_amount_over_time.png', show=True):
+    plt.figure(figsize=(12, 6))
+    plt.plot(df_grouped.index, df_grouped.values, marker='o', linestyle='-')
+    plt.title(f'Total Amount of Services Over Time ({period.capitalize()})')
+    plt.xlabel('Date')
+    plt.ylabel('Total Amount')
+    plt.grid(True)
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    return finish_figure(filename, show)
+
+def plot_pie_chart(data, title, filename, show=True):
+    plt.figure(figsize=(8, 8))
+    # data is already aggregated (counts or sums per slice)
+    data.plot(kind='pie', autopct='%1.1f%%', startangle=140)
+    plt.title(title)
+    plt.ylabel('')
+    return finish_figure(filename, show)
+
+def plot_bar_chart(df, x, y, hue, title, filename, show=True):
+    plt.figure(figsize=(10, 6))
+    sns.barplot(x=x, y=y, hue=hue, data=df, estimator=sum, errorbar=None)
+    plt.title(title)
+    plt.xlabel(x)
+    plt.ylabel(y)
+    plt.xticks(rotation=45)
+    return finish_figure(filename, show)
+
+def plot_line_chart(df, x, y, hue, title, filename, show=True):
+    plt.figure(figsize=(12, 6))
+    sns.lineplot(x=pd.to_datetime(df[x]).dt.date, y=y, hue=hue, data=df, estimator=sum, errorbar=None)
+    plt.title(title)
+    plt.xlabel(x)
+    plt.ylabel(y)
+    plt.xticks(rotation=45)
+    return finish_figure(filename, show)
+
+def plot_location_distribution(counts, filename='locations_served.png', show=True):
+    counts = counts.sort_values(ascending=False)
+    plt.figure(figsize=(12, 6))
+    sns.barplot(x=counts.index.astype(str), y=counts.values, order=counts.index.astype(str))
+    plt.title('Location Distribution')
+    plt.xlabel('Location')
+    plt.ylabel('Count')
+    plt.xticks(rotation=45)
+    return finish_figure(filename, show)
+
+def plot_predicted_demand(future_df, filename='predicted_demand_30_days.png', show=True):
+    daily = future_df.groupby('Date')['Predicted Amount'].mean()
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(daily.index, daily.values, marker='o', linestyle='-')
+    plt.title(f'Predicted Demand Over the Next {len(daily)} Days')
+    plt.xlabel('Date')
+    plt.ylabel('Average Predicted Amount per Segment')
+    plt.grid(True)
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    return finish_figure(filename, show)
@@ -1,18 +1,104 @@
 import pandas as pd
 import numpy as np
+import json
+import os
+import sys
+import uuid
+from fractions import Fraction
+import database
+from activity_store import ActivityLog, is_activity_log, read_table, table_exists, write_table
+from customers import CUSTOMER_INDEX_FILE, CustomerIndex, build_customer_index
 
-def clean_data(input_file, output_file):
-    # Load the data
-    df = pd.read_csv(input_file)
+CLEANING_STATE_FILE = 'cleaning_state.json'
+# Activity history (recorded activities are appended here) and the cleaned data derived from it
+RAW_DATA_FILE = database.data_path('extended_weekly_customers.csv')
+CLEANED_DATA_FILE = database.data_path('cleaned_customers_data.csv')
 
-    # Feature extraction and cleaning
+# Price columns and the number of days each one spreads the amount over
+PRICE_PERIODS = {'Daily Price': 1, 'Weekly Price': 7, 'Monthly Price': 30}
+
+SERVED_COLUMN = 'Number of Times Served'
+
+REQUIRED_COLUMNS = ['Date', 'Day', 'Month', 'Year', 'Customer Name', 'Customer Gender',
+                    'Customer Location', 'Service', 'Size', 'Daily Price', 'Weekly Price',
+                    'Monthly Price', 'Total Amount', 'Number of Times Served']
+
+def exact_sum(values):
+    """Sum floats exactly, so chunked and in-memory means agree to the last bit.
+
+    Each value is split into an integer mantissa and a binary exponent and the
+    mantissas are added as Python integers per exponent; NaN and inf are skipped.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    mantissas, exponents = np.frexp(values)
+    mantissas = (mantissas * 2.0 ** 53).astype(np.int64)
+    total = Fraction(0)
+    for exponent in np.unique(exponents):
+        total += int(mantissas[exponents == exponent].astype(object).sum()) * Fraction(2) ** (int(exponent) - 53)
+    return total
+
+def mean_from_sum(total, count):
+    return float(total) / count if count else np.nan
+
+def add_date_parts(df):
     df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
     df['Day'] = df['Date'].dt.day
     df['Month'] = df['Date'].dt.month
     df['Year'] = df['Date'].dt.year
+    return df
+
+def add_price_columns(df, previous_date=None):
+    """Spread each amount over the gap since the previous activity.
+
+    Negative and infinite prices are left as NaN for the caller to fill.
+    previous_date carries the last date of an earlier batch so the first
+    gap of this batch is measured across the boundary.
+    """
+    gaps = df['Date'].diff()
+    if previous_date is not None and len(df):
+        gaps.iloc[0] = df['Date'].iloc[0] - pd.Timestamp(previous_date)
+    gap_days = gaps.dt.days.fillna(1).astype(int)
+
+    for col, period in PRICE_PERIODS.items():
+        price = df['Total Amount'] / ((gap_days // period) + 1)
+        df[col] = price.mask(np.isinf(price) | (price < 0))
+    return df
+
+def clean_chunk(chunk, customer_index, previous_row=None, previous_date=None, update_index=False):
+    """Date parts, forward fill, gender correction and raw prices for one chunk.
+
+    previous_row is the last (forward-filled) raw row of the preceding chunk
+    and is used to fill leading gaps. With update_index the chunk's customers
+    are recorded in the index before genders are looked up. Returns the chunk
+    and its own last raw row for the next call.
+    """
+    raw_columns = list(chunk.columns)
+    chunk = add_date_parts(chunk)
+    if previous_row:
+        previous = add_date_parts(pd.DataFrame([previous_row]))
+        chunk = pd.concat([previous, chunk], ignore_index=True).ffill().iloc[1:].reset_index(drop=True)
+    else:
+        chunk = chunk.ffill()
+    last_row = row_to_json(chunk[raw_columns].iloc[-1])
+    if update_index:
+        customer_index.update_from_frame(chunk)
+
+    chunk['Customer Gender'] = customer_index.genders(chunk['Customer Name']).fillna(chunk['Customer Gender'])
+    chunk = add_price_columns(chunk, previous_date=previous_date)
+    return chunk, last_row
+
+def clean_data(input_file, output_file, customer_file=CUSTOMER_INDEX_FILE, state_file=CLEANING_STATE_FILE):
+    # Load the data (CSV file or columnar activity log)
+    df = read_table(input_file)
+    raw_columns = list(df.columns)
+
+    # Feature extraction and cleaning
+    df = add_date_parts(df)
 
     # Handling missing values with forward fill
     df = df.ffill()
+    raw_last_row = df[raw_columns].iloc[-1] if not df.empty else pd.Series(dtype=object)
 
     # Extracting and encoding variables
     df['Customer Gender'] = df['Customer Gender'].astype('category')
@@ -20,53 +106,297 @@ def clean_data(input_file, output_file):
     df['Service'] = df['Service'].astype('category')
     df['Size'] = df['Size'].astype('category')
 
-    # Gender correction for consistency
-    gender_corrections = {
-        'John Doe': 'Male', 'Jane Smith': 'Female', 'Emily Brown': 'Female', 'Michael Johnson': 'Male',
-        'Susan Lee': 'Female', 'David Wilson': 'Male', 'Linda Green': 'Female', 'Lucy Clarke': 'Female',
-        'Emma Scott': 'Female', 'Henry Adams': 'Male', 'Anna White': 'Female', 'Peter Stone': 'Male',
-        'Fiona Blake': 'Female', 'Tom Wright': 'Male', 'Sarah Parker': 'Female', 'Oscar Bell': 'Male',
-        'George Hall': 'Male', 'Rachel Green': 'Female', 'Amy Young': 'Female', 'Sam Harris': 'Male',
-        'Laura King': 'Female', 'James Black': 'Male', 'Chris Martin': 'Male', 'Nick Hughes': 'Male',
-        'Nina Roberts': 'Female'
-    }
-    df['Customer Gender'] = df['Customer Name'].map(gender_corrections).fillna(df['Customer Gender'])
-
-    # Create columns for pricing
-    df['Daily Price'] = df['Total Amount'] / (df['Date'].diff().dt.days.fillna(1).astype(int) + 1)
-    df['Weekly Price'] = df['Total Amount'] / ((df['Date'].diff().dt.days.fillna(1).astype(int) // 7) + 1)
-    df['Monthly Price'] = df['Total Amount'] / ((df['Date'].diff().dt.days.fillna(1).astype(int) // 30) + 1)
+    # Rebuild the customer index, it holds the corrected gender of every customer
+    customer_index = build_customer_index(df, customer_file)
+    df['Customer Gender'] = customer_index.genders(df['Customer Name']).fillna(df['Customer Gender'])
 
-    # Replace negative and infinite prices with NaN for further handling
-    df['Daily Price'] = df['Daily Price'].replace([np.inf, -np.inf], np.nan)
-    df['Weekly Price'] = df['Weekly Price'].replace([np.inf, -np.inf], np.nan)
-    df['Monthly Price'] = df['Monthly Price'].replace([np.inf, -np.inf], np.nan)
-    df['Daily Price'] = df['Daily Price'].apply(lambda x: np.nan if x < 0 else x)
-    df['Weekly Price'] = df['Weekly Price'].apply(lambda x: np.nan if x < 0 else x)
-    df['Monthly Price'] = df['Monthly Price'].apply(lambda x: np.nan if x < 0 else x)
+    # Create columns for pricing, negative and infinite prices become NaN
+    df = add_price_columns(df)
 
     # Fill missing prices with the mean value
-    df['Daily Price'] = df['Daily Price'].fillna(df['Daily Price'].mean())
-    df['Weekly Price'] = df['Weekly Price'].fillna(df['Weekly Price'].mean())
-    df['Monthly Price'] = df['Monthly Price'].fillna(df['Monthly Price'].mean())
+    for col in PRICE_PERIODS:
+        df[col] = df[col].fillna(mean_from_sum(exact_sum(df[col]), df[col].count()))
 
-    # Counting the number of times each customer has been served
-    df['Number of Times Served'] = df.groupby('Customer Name')['Customer Name'].transform('count')
+    # Number of times each customer has been served, near-duplicate names share a count
+    df['Number of Times Served'] = customer_index.served_counts(df['Customer Name'])
 
     # Ensure required columns are included
-    required_columns = ['Date', 'Day', 'Month', 'Year', 'Customer Name', 'Customer Gender',
-                        'Customer Location', 'Service', 'Size', 'Daily Price', 'Weekly Price',
-                        'Monthly Price', 'Total Amount', 'Number of Times Served']
-    for col in required_columns:
+    for col in REQUIRED_COLUMNS:
         if col not in df.columns:
             df[col] = np.nan  # Add missing columns with NaN values
 
     # Save the cleaned data
-    df_cleaned = df[required_columns]
-    df_cleaned.to_csv(output_file, index=False)
+    df_cleaned = df[REQUIRED_COLUMNS]
+    write_table(df_cleaned, output_file, append=False)
+    customer_index.save()
+    # Incremental runs continue from this clean, not from an older watermark
+    save_cleaning_state(build_cleaning_state(raw_last_row, df_cleaned, len(df_cleaned), output_file), state_file)
     print(f"Data cleaned and saved to {output_file}")
+    return df_cleaned
+
+def count_rows(input_file):
+    if database.is_database_path(input_file):
+        return database.count_rows(input_file)
+    if is_activity_log(input_file):
+        return len(ActivityLog(input_file))
+    with open(input_file, 'r') as f:
+        return max(sum(1 for _ in f) - 1, 0)
+
+def read_new_rows(input_file, offset):
+    """Read only the rows appended after the given row offset."""
+    if database.is_database_path(input_file):
+        return database.read_rows(input_file, offset)
+    if is_activity_log(input_file):
+        return ActivityLog(input_file).read(start_row=offset)
+    return pd.read_csv(input_file, skiprows=range(1, offset + 1))
+
+def load_cleaning_state(state_file=CLEANING_STATE_FILE):
+    if os.path.isfile(state_file):
+        with open(state_file, 'r') as f:
+            return json.load(f)
+    return None
+
+def save_cleaning_state(state, state_file=CLEANING_STATE_FILE):
+    tmp_file = state_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(state, f, indent=4)
+    os.replace(tmp_file, state_file)
+
+def row_to_json(row):
+    """Convert a row to JSON-safe values, keeping numbers numeric."""
+    values = {}
+    for col, value in row.items():
+        if pd.isna(value):
+            values[col] = None
+        elif isinstance(value, pd.Timestamp):
+            values[col] = str(value)
+        else:
+            values[col] = value.item() if hasattr(value, 'item') else value
+    return values
+
+def cleaning_state(rows, raw_last_row, last_date, price_sums, price_counts, output_file=None):
+    """The state incremental runs continue from, for a full clean that (re)wrote output_file.
+
+    Each full clean gets a new generation; incremental cleans count the
+    rewrites of earlier rows per column, so stores derived from the output
+    can tell it was rewritten (see output_version).
+    """
+    return {
+        'input_file_rows': rows,
+        'last_row': row_to_json(raw_last_row),
+        'last_date': None if last_date is None else str(last_date),
+        'price_sums': {col: float(price_sums[col]) for col in PRICE_PERIODS},
+        'price_counts': {col: int(price_counts[col]) for col in PRICE_PERIODS},
+        'output_file': output_file,
+        'generation': uuid.uuid4().hex,
+        'column_generations': {}
+    }
+
+def build_cleaning_state(raw_last_row, df_cleaned, rows, output_file=None):
+    """Summarise a cleaned dataset into the state incremental runs continue from."""
+    return cleaning_state(rows, raw_last_row, None if df_cleaned.empty else df_cleaned['Date'].iloc[-1],
+                          {col: df_cleaned[col].sum() for col in PRICE_PERIODS},
+                          {col: df_cleaned[col].count() for col in PRICE_PERIODS}, output_file)
+
+def output_version(output_file, columns=None, state_file=CLEANING_STATE_FILE):
+    """What the rows of a cleaned output currently hold: the full clean that wrote it plus the
+    rewrites of the given columns (every column when None) since. None when the cleaning state
+    describes another file."""
+    state = load_cleaning_state(state_file)
+    if (state is None or not state.get('output_file')
+            or os.path.abspath(state['output_file']) != os.path.abspath(output_file)):
+        return None
+    rewrites = state['column_generations']
+    return (state['generation'],) + tuple((col, rewrites[col]) for col in sorted(rewrites)
+                                          if columns is None or col in columns)
+
+def clean_data_incremental(input_file, output_file, state_file=CLEANING_STATE_FILE,
+                           customer_file=CUSTOMER_INDEX_FILE):
+    """Clean only the activities appended since the last run.
+
+    The state file keeps a row-offset watermark plus what the derived columns
+    depend on: the last raw row (forward fill), the last date (price diffs at
+    the boundary) and running price sums/counts (mean fill); served counts
+    come from the customer index. New rows are cleaned against that state
+    and appended to the output, and the earlier rows of their customers get
+    the new served count and gender. Mean-filled prices of earlier rows are
+    not rewritten; they reflect the history at the time they were cleaned.
+    """
+    state = load_cleaning_state(state_file)
+    total_rows = count_rows(input_file)
+
+    # Without a usable watermark (first run, truncated input, missing output or an output
+    # that does not hold exactly the rows the watermark covers) rebuild everything
+    if (state is None or state['input_file_rows'] > total_rows or not table_exists(output_file)
+            or not table_exists(customer_file) or count_rows(output_file) != state['input_file_rows']):
+        return clean_data(input_file, output_file, customer_file, state_file)
+
+    offset = state['input_file_rows']
+    if offset == total_rows:
+        print("No new activities to clean.")
+        return None
+
+    customer_index = CustomerIndex(customer_file)
+    batch, raw_last_row = clean_chunk(read_new_rows(input_file, offset), customer_index,
+                                      state['last_row'], state['last_date'], update_index=True)
+
+    # Running means replace the global means of the full clean
+    for col in PRICE_PERIODS:
+        state['price_sums'][col] += float(batch[col].sum())
+        state['price_counts'][col] += int(batch[col].count())
+        if state['price_counts'][col]:
+            batch[col] = batch[col].fillna(state['price_sums'][col] / state['price_counts'][col])
+
+    # The index already counts this batch, stamp the new totals on its rows
+    batch['Number of Times Served'] = customer_index.served_counts(batch['Customer Name'])
+
+    for col in REQUIRED_COLUMNS:
+        if col not in batch.columns:
+            batch[col] = np.nan
+
+    df_cleaned = batch[REQUIRED_COLUMNS]
+    keys = {customer_index.resolve(name) for name in pd.unique(batch['Customer Name'].dropna())}
+    rewritten = refresh_customer_columns(output_file, customer_index, keys - {None})
+    write_table(df_cleaned, output_file, append=True)
+    generations = state.setdefault('column_generations', {})
+    for col in rewritten:
+        generations[col] = generations.get(col, 0) + 1
+
+    state['input_file_rows'] = total_rows
+    state['last_row'] = raw_last_row
+    state['last_date'] = str(batch['Date'].iloc[-1])
+    save_cleaning_state(state, state_file)
+    customer_index.save()
+    print(f"{len(df_cleaned)} new activities cleaned and appended to {output_file}")
+    return df_cleaned
+
+def _format_like(text, value):
+    """A number written the way the cell it replaces was (pandas writes counts next to gaps as floats)."""
+    return f"{value}.0" if '.' in text else str(value)
+
+def _patch_customer_columns(frame, customer_index, keys, as_text=False):
+    """Set the indexed served count and gender on the rows of the given customers, in place.
+
+    Returns {name: {column: value}} for the names whose rows changed.
+    """
+    updates = {}
+    for name in pd.unique(frame['Customer Name'].dropna()):
+        key = customer_index.resolve(name)
+        if key not in keys:
+            continue
+        entry = customer_index.customers[key]
+        rows = frame['Customer Name'] == name
+        stale = rows & (pd.to_numeric(frame[SERVED_COLUMN], errors='coerce') != entry['served'])
+        if stale.any():
+            frame.loc[stale, SERVED_COLUMN] = (frame.loc[stale, SERVED_COLUMN].map(lambda text: _format_like(text, entry['served']))
+                                               if as_text else entry['served'])
+            updates.setdefault(name, {})[SERVED_COLUMN] = entry['served']
+        if entry['gender'] is not None:
+            stale = rows & (frame['Customer Gender'] != entry['gender'])
+            if stale.any():
+                frame.loc[stale, 'Customer Gender'] = entry['gender']
+                updates.setdefault(name, {})['Customer Gender'] = entry['gender']
+    return updates
+
+def refresh_customer_columns(output_file, customer_index, keys, chunksize=50000):
+    """Stamp the indexed served count and gender on the cleaned rows of the given customers.
+
+    A database table is updated in place through its name index and an
+    activity log rewrites the two columns; a CSV file is streamed through
+    as text, so every other cell is copied unchanged. Returns the columns
+    that changed.
+    """
+    if not keys or not table_exists(output_file):
+        return set()
+    columns = ['Customer Name', SERVED_COLUMN, 'Customer Gender']
+    if database.is_database_path(output_file):
+        updates = _patch_customer_columns(database.read_table(output_file, columns), customer_index, keys)
+        database.update_rows(output_file, 'Customer Name', updates)
+        return {col for values in updates.values() for col in values}
+    if is_activity_log(output_file):
+        log = ActivityLog(output_file)
+        data = log.read(columns, mmap=False).astype({'Customer Name': object, 'Customer Gender': object})
+        changed = {col for values in _patch_customer_columns(data, customer_index, keys).values() for col in values}
+        for col in changed:
+            log.replace_column(col, data[col])
+        return changed
+
+    changed = set()
+    tmp_file = output_file + '.tmp'
+    with open(tmp_file, 'w', newline='') as f:
+        for i, chunk in enumerate(pd.read_csv(output_file, dtype=str, keep_default_na=False, chunksize=chunksize)):
+            updates = _patch_customer_columns(chunk, customer_index, keys, as_text=True)
+            changed.update(col for values in updates.values() for col in values)
+            chunk.to_csv(f, index=False, header=i == 0)
+    if changed:
+        os.replace(tmp_file, output_file)
+    else:
+        os.remove(tmp_file)
+    return changed
+
+def iter_chunks(input_file, chunksize):
+    if database.is_database_path(input_file):
+        return database.iter_chunks(input_file, chunksize)
+    if is_activity_log(input_file):
+        return ActivityLog(input_file).iter_chunks(chunksize)
+    return pd.read_csv(input_file, chunksize=chunksize)
+
+def clean_data_streaming(input_file, output_file, chunksize=50000, customer_file=CUSTOMER_INDEX_FILE,
+                         state_file=CLEANING_STATE_FILE):
+    """Clean a file larger than memory in fixed-size chunks.
+
+    The first pass collects what the full clean derives from the whole file
+    (price sums and counts for the mean fill, the customer index).
+    The second pass cleans each chunk again with those totals and appends it
+    to the output, carrying the last row and date across chunk boundaries.
+    Peak memory is one chunk plus one entry per customer.
+    """
+    price_sums = {col: Fraction(0) for col in PRICE_PERIODS}
+    price_counts = {col: 0 for col in PRICE_PERIODS}
+    customer_index = build_customer_index(path=customer_file)
+    float_columns = set()
+    previous_row, previous_date = None, None
+    for chunk in iter_chunks(input_file, chunksize):
+        chunk, previous_row = clean_chunk(chunk, customer_index, previous_row, previous_date, update_index=True)
+        previous_date = chunk['Date'].iloc[-1]
+        for col in PRICE_PERIODS:
+            price_sums[col] += exact_sum(chunk[col])
+            price_counts[col] += int(chunk[col].count())
+        # A column with gaps anywhere is float in the in-memory version
+        float_columns.update(col for col in chunk.columns if chunk[col].dtype.kind == 'f')
+
+    means = {col: mean_from_sum(price_sums[col], price_counts[col]) for col in PRICE_PERIODS}
+    previous_row, previous_date = None, None
+    filled_sums = {col: 0.0 for col in PRICE_PERIODS}
+    filled_counts = {col: 0 for col in PRICE_PERIODS}
+    rows = 0
+    for chunk in iter_chunks(input_file, chunksize):
+        chunk, previous_row = clean_chunk(chunk, customer_index, previous_row, previous_date)
+        previous_date = chunk['Date'].iloc[-1]
+        for col in PRICE_PERIODS:
+            chunk[col] = chunk[col].fillna(means[col])
+            filled_sums[col] += chunk[col].sum()
+            filled_counts[col] += int(chunk[col].count())
+        chunk['Number of Times Served'] = customer_index.served_counts(chunk['Customer Name'])
+        for col in REQUIRED_COLUMNS:
+            if col not in chunk.columns:
+                chunk[col] = np.nan
+        chunk = chunk.astype({col: np.float64 for col in float_columns if chunk[col].dtype.kind in 'iu'})
+        write_table(chunk[REQUIRED_COLUMNS], output_file, append=rows > 0)
+        rows += len(chunk)
+
+    customer_index.save()
+    save_cleaning_state(cleaning_state(rows, previous_row or {}, previous_date, filled_sums, filled_counts, output_file),
+                        state_file)
+    print(f"Data cleaned in chunks of {chunksize} rows and saved to {output_file}")
+    return rows
 
 if __name__ == "__main__":
-    input_file = 'extended_weekly_customers.csv'
-    output_file = 'cleaned_customers_data.csv'
-    clean_data(input_file, output_file)
+    input_file = RAW_DATA_FILE
+    output_file = CLEANED_DATA_FILE
+    if '--incremental' in sys.argv:
+        clean_data_incremental(input_file, output_file)
+    elif '--streaming' in sys.argv:
+        clean_data_streaming(input_file, output_file)
+    else:
+        clean_data(input_file, output_file)
@@ -1,9 +1,18 @@
 import pandas as pd
 from datetime import datetime
-import os
+import sys
+from activity_store import write_table
+from cleaning_data import RAW_DATA_FILE
+from pricing import SIZED_SERVICES, load_price_book, normalize_services, requires_size
 
-def record_activity():
+# Same order as the customer history, so cleaning and training get the size too
+ACTIVITY_COLUMNS = ["Date", "Customer Name", "Customer Location", "Customer Gender", "Service", "Size", "Total Amount"]
+VALID_GENDERS = ["Male", "Female"]
+VALID_SIZES = ["Small", "Medium", "Large"]
+
+def record_activity(output_file=RAW_DATA_FILE):
     print("\nEnter Daily Activity")
+    price_book = load_price_book()
 
     while True:
         date = input("Enter the date (YYYY-MM-DD): ")
@@ -18,65 +27,136 @@ def record_activity():
 
     while True:
         customer_gender = input("Enter customer's gender (Male/Female): ").strip().capitalize()
-        if customer_gender in ["Male", "Female"]:
+        if customer_gender in VALID_GENDERS:
             break
         print("Invalid gender. Please enter 'Male' or 'Female'.")
 
     while True:
-        service = input("Enter service type (Dry Cleaning, Duvet/Blanket Cleaning, Clothes Cleaning): ").strip().capitalize()
-        service_dict = {
-            "Dry cleaning": 500,
-            "Duvet/blanket cleaning": ["Small", "Medium", "Large"],
-            "Clothes cleaning": ["Small", "Medium", "Large"]
-        }
-
-        if service in service_dict:
+        service = normalize_services([input("Enter service type (Dry Cleaning, Duvet/Blanket Cleaning, Clothes Cleaning): ")])[0]
+        if isinstance(service, str):
             break
         print("Invalid service type. Please enter 'Dry Cleaning', 'Duvet/Blanket Cleaning', or 'Clothes Cleaning'.")
 
-    if service == "Duvet/blanket cleaning":
+    size = ""
+    if requires_size(service):
         while True:
             size = input("Enter size (Small, Medium, Large): ").strip().capitalize()
-            if size in service_dict[service]:
-                amount = {"Small": 200, "Medium": 350, "Large": 500}[size]
+            if size in VALID_SIZES:
                 break
             print("Invalid size. Please enter 'Small', 'Medium', or 'Large'.")
-    elif service == "Clothes cleaning":
-        while True:
-            size = input("Enter bin size (Small, Medium, Large): ").strip().capitalize()
-            if size in service_dict[service]:
-                amount = {"Small": 300, "Medium": 400, "Large": 600}[size]
-                break
-            print("Invalid bin size. Please enter 'Small', 'Medium', or 'Large'.")
-    else:
-        amount = 500
 
     while True:
         ironing = input("Was ironing included? (yes/no): ").strip().lower()
         if ironing in ["yes", "no"]:
-            if ironing == "yes":
-                amount += 200
             break
         print("Invalid input. Please enter 'yes' or 'no'.")
 
+    amount = price_book.price_one(service, size, ironing == "yes", date)
+    if amount is None:
+        print(f"No price list is in effect on {date}.")
+        return
+
     activity = {
         "Date": date,
         "Customer Name": customer_name,
         "Customer Location": customer_location,
         "Customer Gender": customer_gender,
         "Service": service,
+        "Size": size,
         "Total Amount": amount
     }
 
     df = pd.DataFrame([activity])
 
-    file_exists = os.path.isfile('daily_activities.csv')
-
     try:
-        df.to_csv('daily_activities.csv', mode='a', index=False, header=not file_exists)
+        write_table(df, output_file)
         print("Activity recorded successfully!")
     except Exception as e:
         print(f"An error occurred while saving the activity: {e}")
 
+def load_batch(source):
+    """Load a batch of activities from a CSV/JSONL path, a DataFrame or an iterable of dicts."""
+    if isinstance(source, pd.DataFrame):
+        return source.copy()
+    if isinstance(source, str):
+        if source.lower().endswith(('.jsonl', '.json')):
+            return pd.read_json(source, lines=True, dtype=False)
+        return pd.read_csv(source, dtype=str, keep_default_na=False)
+    return pd.DataFrame(list(source))
+
+def validate_batch(batch):
+    """Normalize a batch and split it into priced rows and rejects with a reason."""
+    df = batch.copy()
+    for col in ["Date", "Customer Name", "Customer Location", "Customer Gender", "Service", "Size", "Ironing"]:
+        if col not in df.columns:
+            df[col] = ""
+    text = df[["Customer Name", "Customer Location", "Customer Gender", "Service", "Size", "Ironing"]].fillna("").astype(str)
+    for col in text.columns:
+        text[col] = text[col].str.strip()
+
+    df["Customer Name"] = text["Customer Name"]
+    df["Customer Location"] = text["Customer Location"]
+    df["Customer Gender"] = text["Customer Gender"].str.capitalize()
+    df["Service"] = normalize_services(text["Service"])
+    df["Size"] = text["Size"].str.capitalize()
+    df["Size"] = df["Size"].where(df["Size"].isin(VALID_SIZES) | df["Service"].isin(SIZED_SERVICES), "")
+    ironing = text["Ironing"].str.lower()
+    dates = pd.to_datetime(df["Date"].astype(str).str.strip(), format="%Y-%m-%d", errors="coerce")
+
+    # Price every row in one pass against the list in effect on its date
+    is_ironed = ironing.isin(["yes", "true", "1"])
+    amount = pd.Series(load_price_book().price(df["Service"], df["Size"], is_ironed, dates), index=df.index)
+
+    # Evaluate every check on the whole batch, keep the first failure per row
+    checks = [
+        (dates.isna(), "Invalid date format. Please use YYYY-MM-DD."),
+        (df["Customer Name"] == "", "Missing customer name."),
+        (~df["Customer Gender"].isin(VALID_GENDERS), "Invalid gender. Please enter 'Male' or 'Female'."),
+        (df["Service"].isna(), "Invalid service type."),
+        (df["Service"].isin(SIZED_SERVICES) & ~df["Size"].isin(VALID_SIZES), "Invalid size. Please enter 'Small', 'Medium', or 'Large'."),
+        (~ironing.isin(["yes", "no", "true", "false", "1", "0", ""]), "Invalid ironing value. Please enter 'yes' or 'no'."),
+        (amount.isna(), "No price list is in effect for this date, service and size.")
+    ]
+    reason = pd.Series(None, index=df.index, dtype=object)
+    for failed, message in reversed(checks):
+        reason = reason.mask(failed, message)
+
+    rejected = reason.notna()
+    df["Date"] = dates.dt.strftime("%Y-%m-%d")
+    df["Total Amount"] = amount
+
+    accepted = df.loc[~rejected, ACTIVITY_COLUMNS].astype({"Total Amount": int})
+    rejects = batch.loc[rejected].copy()
+    rejects["Reason"] = reason[rejected]
+    return accepted, rejects
+
+def record_activities_bulk(source, output_file=RAW_DATA_FILE):
+    """Validate, price and append a whole batch of activities with a single write.
+
+    Activities go to the raw history, which the incremental clean picks up before each retrain.
+    """
+    try:
+        batch = load_batch(source)
+    except (OSError, ValueError) as e:
+        print(f"An error occurred while loading the batch: {e}")
+        return None, None
+
+    accepted, rejects = validate_batch(batch)
+
+    if not accepted.empty:
+        try:
+            write_table(accepted, output_file)
+        except Exception as e:
+            print(f"An error occurred while saving the batch: {e}")
+            return None, rejects
+
+    print(f"{len(accepted)} activities recorded, {len(rejects)} rejected.")
+    for row, reason in rejects["Reason"].items():
+        print(f"  Row {row}: {reason}")
+    return accepted, rejects
+
 if __name__ == "__main__":
-    record_activity()
+    if len(sys.argv) > 1:
+        record_activities_bulk(sys.argv[1])
+    else:
+        record_activity()
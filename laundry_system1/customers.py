@@ -0,0 +1,209 @@
+import difflib
+import json
+import os
+import sys
+
+import pandas as pd
+
+import database
+
+CUSTOMER_INDEX_FILE = database.data_path('customers.json')
+# Minimum difflib similarity for two names to be listed by near_duplicates() for review.
+# Similar names are never merged automatically ('Jane Smith' and 'Janet Smith' are different people).
+NAME_MATCH_CUTOFF = 0.9
+
+# Known genders for regular customers, these win over whatever was typed in
+KNOWN_GENDERS = {
+    'John Doe': 'Male', 'Jane Smith': 'Female', 'Emily Brown': 'Female', 'Michael Johnson': 'Male',
+    'Susan Lee': 'Female', 'David Wilson': 'Male', 'Linda Green': 'Female', 'Lucy Clarke': 'Female',
+    'Emma Scott': 'Female', 'Henry Adams': 'Male', 'Anna White': 'Female', 'Peter Stone': 'Male',
+    'Fiona Blake': 'Female', 'Tom Wright': 'Male', 'Sarah Parker': 'Female', 'Oscar Bell': 'Male',
+    'George Hall': 'Male', 'Rachel Green': 'Female', 'Amy Young': 'Female', 'Sam Harris': 'Male',
+    'Laura King': 'Female', 'James Black': 'Male', 'Chris Martin': 'Male', 'Nick Hughes': 'Male',
+    'Nina Roberts': 'Female'
+}
+
+def normalize_name(name):
+    """Collapse whitespace and case so 'rodi', 'Rodi ' and ' RODI' share one key."""
+    return ' '.join(str(name).split()).casefold()
+
+KNOWN_GENDER_KEYS = {normalize_name(name): gender for name, gender in KNOWN_GENDERS.items()}
+
+class CustomerIndex:
+    """Persistent customer dimension keyed by normalized name.
+
+    Each entry keeps the display name, gender, home location, first/last
+    visit and a running served count. Names resolve on their normalized key
+    (case and whitespace) plus confirmed aliases, a dictionary lookup, so
+    recording a ticket costs O(1) per customer. Similar names are found
+    offline with near_duplicates() and joined with merge() once confirmed.
+    """
+
+    def __init__(self, path=CUSTOMER_INDEX_FILE):
+        self.path = path
+        self.customers = {}
+        self.aliases = {}
+        # A database table ('laundry.db#customers') holds the same index as the JSON file
+        if path and database.is_database_path(path):
+            self.customers, self.aliases = database.load_customers(path)
+        elif path and os.path.isfile(path):
+            with open(path, 'r') as f:
+                data = json.load(f)
+            self.customers = data.get('customers', {})
+            self.aliases = data.get('aliases', {})
+
+    def __len__(self):
+        return len(self.customers)
+
+    def save(self, path=None):
+        path = path or self.path
+        if database.is_database_path(path):
+            database.save_customers(self.customers, self.aliases, path)
+            return
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'customers': self.customers, 'aliases': self.aliases}, f, indent=4)
+        os.replace(tmp_path, path)
+
+    def resolve(self, name, create=False):
+        """Return the canonical key for a name: its normalized form or a confirmed alias of it."""
+        if name is None or pd.isna(name):
+            return None
+        key = normalize_name(name)
+        if not key:
+            return None
+        key = self.aliases.get(key, key)
+        if key in self.customers:
+            return key
+        if not create:
+            return None
+
+        self.customers[key] = {
+            'name': str(name).strip(), 'gender': KNOWN_GENDER_KEYS.get(key), 'home_location': None,
+            'locations': {}, 'first_visit': None, 'last_visit': None, 'served': 0
+        }
+        return key
+
+    def update(self, name, gender=None, location=None, date=None):
+        """Record one activity for a customer."""
+        self.update_from_frame(pd.DataFrame([{'Date': date, 'Customer Name': name,
+                                              'Customer Gender': gender, 'Customer Location': location}]))
+
+    def update_from_frame(self, df):
+        """Record a batch of activities, aggregating per customer before touching the index."""
+        names = df['Customer Name']
+        lookup = {name: self.resolve(name, create=True) for name in pd.unique(names.dropna())}
+        batch = pd.DataFrame({
+            'key': names.map(lookup),
+            'date': pd.to_datetime(df['Date'], errors='coerce') if 'Date' in df.columns else pd.NaT,
+            'gender': df['Customer Gender'] if 'Customer Gender' in df.columns else None,
+            'location': df['Customer Location'] if 'Customer Location' in df.columns else None
+        }).astype({'gender': object, 'location': object}).dropna(subset=['key'])
+
+        summary = batch.groupby('key', sort=False).agg(
+            served=('key', 'size'), first_visit=('date', 'min'), last_visit=('date', 'max'),
+            gender=('gender', 'first'))
+        locations = batch.dropna(subset=['location']).groupby(['key', 'location'], sort=False).size()
+
+        for key, row in summary.iterrows():
+            entry = self.customers[key]
+            entry['served'] += int(row['served'])
+            if entry['gender'] is None and pd.notna(row['gender']):
+                entry['gender'] = row['gender']
+            if pd.notna(row['first_visit']):
+                first_visit = str(row['first_visit'].date())
+                last_visit = str(row['last_visit'].date())
+                if entry['first_visit'] is None or first_visit < entry['first_visit']:
+                    entry['first_visit'] = first_visit
+                if entry['last_visit'] is None or last_visit > entry['last_visit']:
+                    entry['last_visit'] = last_visit
+
+        for (key, location), count in locations.items():
+            entry = self.customers[key]
+            entry['locations'][location] = entry['locations'].get(location, 0) + int(count)
+            home = entry['home_location']
+            if home is None or entry['locations'][location] > entry['locations'].get(home, 0):
+                entry['home_location'] = location
+
+    def _lookup(self, names, field):
+        values = {}
+        for name in pd.unique(names.dropna()):
+            key = self.resolve(name)
+            values[name] = self.customers[key][field] if key else None
+        return names.map(values)
+
+    def served_counts(self, names):
+        """Running served count for each name in a Series."""
+        return self._lookup(names, 'served')
+
+    def genders(self, names):
+        """Indexed gender for each name in a Series (NaN when unknown)."""
+        return self._lookup(names, 'gender')
+
+    def top_customers(self, n=5):
+        ranked = sorted(self.customers.values(), key=lambda entry: entry['served'], reverse=True)
+        return pd.DataFrame(ranked[:n], columns=['name', 'gender', 'home_location', 'first_visit',
+                                                 'last_visit', 'served'])
+
+    def near_duplicates(self, cutoff=NAME_MATCH_CUTOFF):
+        """Pairs of indexed names that look like the same customer, for manual review.
+
+        An offline pass: names are only compared within blocks sharing the
+        first letter of their first and last words, and pairs whose known
+        genders differ are skipped.
+        """
+        blocks = {}
+        for key in sorted(self.customers):
+            words = key.split()
+            blocks.setdefault((words[0][0], words[-1][0]), []).append(key)
+        pairs = []
+        for keys in blocks.values():
+            for i, key in enumerate(keys):
+                for other in difflib.get_close_matches(key, keys[i + 1:], n=5, cutoff=cutoff):
+                    first, second = self.customers[key], self.customers[other]
+                    if first['gender'] and second['gender'] and first['gender'] != second['gender']:
+                        continue
+                    pairs.append((first['name'], second['name']))
+        return pairs
+
+    def merge(self, duplicate, canonical):
+        """Fold a customer confirmed to be a duplicate into another; the name becomes an alias."""
+        duplicate_key, canonical_key = self.resolve(duplicate), self.resolve(canonical)
+        if duplicate_key is None or canonical_key is None:
+            raise ValueError(f"Unknown customer: '{duplicate if duplicate_key is None else canonical}'.")
+        if duplicate_key == canonical_key:
+            return canonical_key
+        entry, target = self.customers.pop(duplicate_key), self.customers[canonical_key]
+        target['served'] += entry['served']
+        target['gender'] = target['gender'] or entry['gender']
+        for location, count in entry['locations'].items():
+            target['locations'][location] = target['locations'].get(location, 0) + count
+        if target['locations']:
+            target['home_location'] = max(target['locations'], key=target['locations'].get)
+        visits = [v for v in (target['first_visit'], entry['first_visit']) if v]
+        target['first_visit'] = min(visits) if visits else None
+        visits = [v for v in (target['last_visit'], entry['last_visit']) if v]
+        target['last_visit'] = max(visits) if visits else None
+        self.aliases = {alias: canonical_key if key == duplicate_key else key for alias, key in self.aliases.items()}
+        self.aliases[duplicate_key] = canonical_key
+        return canonical_key
+
+def build_customer_index(df=None, path=CUSTOMER_INDEX_FILE):
+    """Start a fresh index (ignoring any saved one), optionally from a full activity history."""
+    index = CustomerIndex(path=None)
+    index.path = path
+    if df is not None:
+        index.update_from_frame(df)
+    return index
+
+if __name__ == "__main__":
+    index = CustomerIndex()
+    print(f"{len(index)} customers indexed.")
+    print(index.top_customers().to_string(index=False))
+    if len(sys.argv) == 4 and sys.argv[1] == 'merge':
+        # Confirm a duplicate: python customers.py merge <duplicate name> <canonical name>
+        index.merge(sys.argv[2], sys.argv[3])
+        index.save()
+        print(f"'{sys.argv[2]}' merged into '{sys.argv[3]}'.")
+    for first, second in index.near_duplicates(cutoff=0.8):
+        print(f"Possible duplicate: '{first}' / '{second}'")
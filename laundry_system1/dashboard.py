@@ -0,0 +1,111 @@
+import time
+import tkinter as tk
+from tkinter import ttk
+
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+
+from activity_store import table_exists
+from cleaning_data import CLEANED_DATA_FILE
+from downsampling import MAX_PLOT_POINTS, downsample
+from periods import PERIODS
+from rollup import COUNT, RollupCube, load_rollup
+
+# Bars shown on the location chart
+TOP_LOCATIONS = 10
+
+class DashboardFrame(tk.Frame):
+    """Live charts embedded in the Tk app.
+
+    The figure, its axes and their artists are created once. A refresh
+    pushes new data into the existing line and bars (set_data/set_height)
+    and redraws lazily; bars are only rebuilt, and the tight layout only
+    recomputed, when their categories change.
+    Data comes from the rollup cube, and recorded activities are folded
+    into it in memory, so a refresh never rereads the data file.
+    """
+
+    def __init__(self, parent, data_file=CLEANED_DATA_FILE, period='daily'):
+        super().__init__(parent, bg="#ecf0f1")
+        self.cube = load_rollup(data_file) if table_exists(data_file) else RollupCube(source=data_file)
+        self.period = tk.StringVar(value=period)
+
+        controls = tk.Frame(self, bg="#ecf0f1")
+        controls.pack(fill=tk.X, padx=10, pady=5)
+        tk.Label(controls, text="Period:", bg="#ecf0f1").pack(side=tk.LEFT)
+        period_box = ttk.Combobox(controls, textvariable=self.period, values=list(PERIODS), state="readonly", width=10)
+        period_box.pack(side=tk.LEFT, padx=5)
+        period_box.bind("<<ComboboxSelected>>", lambda event: self.refresh())
+        self.status_label = tk.Label(controls, text="", bg="#ecf0f1")
+        self.status_label.pack(side=tk.RIGHT)
+
+        self.figure = Figure(figsize=(10, 7), tight_layout=True)
+        self.ax_time, self.ax_service, self.ax_gender, self.ax_location = self.figure.subplots(2, 2).flat
+        self.time_line, = self.ax_time.plot([], [], marker='o', linestyle='-')
+        # The line starts empty, so the axis must be told it holds dates
+        self.ax_time.xaxis_date()
+        self.ax_time.grid(True)
+        self.ax_service.set_title('Service Distribution')
+        self.ax_gender.set_title('Spending by Gender')
+        self.ax_location.set_title('Locations Served')
+        self.bars = {}
+        self.layout_dirty = True
+
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self)
+        self.canvas.get_tk_widget().pack(expand=True, fill=tk.BOTH)
+        self.refresh()
+
+    def add_activities(self, activities):
+        """Fold newly recorded activities into the charts."""
+        self.cube.update_from_frame(activities)
+        self.refresh()
+
+    def refresh(self):
+        started = time.perf_counter()
+        period = self.period.get()
+        totals = downsample(self.cube.period_totals(period), MAX_PLOT_POINTS) if len(self.cube) else None
+        if totals is not None:
+            self.time_line.set_data(totals.index, totals.values)
+        self.ax_time.set_title(f'Total Amount Over Time ({period.capitalize()})')
+        self.ax_time.relim()
+        self.ax_time.autoscale_view()
+
+        self._update_bars(self.ax_service, self.cube.totals(['Service'], COUNT))
+        self._update_bars(self.ax_gender, self.cube.totals(['Customer Gender']))
+        locations = self.cube.totals(['Customer Location'], COUNT).sort_values(ascending=False)
+        self._update_bars(self.ax_location, locations.head(TOP_LOCATIONS))
+
+        # Tight layout costs more than the redraw itself, only run it when the tick labels changed
+        self.figure.set_layout_engine('tight' if self.layout_dirty else 'none')
+        self.layout_dirty = False
+        self.canvas.draw_idle()
+        self.status_label.config(text=f"{self.cube.rows} activities, updated in "
+                                      f"{(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def _update_bars(self, ax, values):
+        labels = [str(label) for label in values.index]
+        container, old_labels = self.bars.get(ax, (None, None))
+        if container is not None and labels == old_labels:
+            for rect, height in zip(container, values.values):
+                rect.set_height(height)
+        else:
+            # New categories: replace this chart's bars only
+            if container is not None:
+                container.remove()
+            container = ax.bar(range(len(labels)), values.values)
+            ax.set_xticks(range(len(labels)), labels, rotation=45, ha='right')
+            self.bars[ax] = (container, labels)
+            self.layout_dirty = True
+        ax.relim()
+        ax.autoscale_view()
+
+def open_dashboard(root, data_file=CLEANED_DATA_FILE, period='daily'):
+    """Open the dashboard in its own window and return the frame (to feed it new activities)."""
+    window = tk.Toplevel(root)
+    window.title("Dashboard")
+    window.geometry("1000x750")
+    window.configure(bg="#ecf0f1")
+    dashboard = DashboardFrame(window, data_file, period)
+    dashboard.pack(expand=True, fill=tk.BOTH)
+    tk.Button(window, text="Close", command=window.destroy, bg="#e74c3c", fg="white").pack(pady=5)
+    return dashboard
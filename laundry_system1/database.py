@@ -0,0 +1,276 @@
+import json
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Tables are addressed as '<database file>#<table>', e.g. 'laundry.db#activities'
+DATABASE_FILE = 'laundry.db'
+# Set to a database file (e.g. LAUNDRY_DATABASE=laundry.db) to run the app on its tables instead of the flat files
+DATABASE_SETTING = 'LAUNDRY_DATABASE'
+TABLE_SEPARATOR = '#'
+DATABASE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+# Columns indexed on every table that has them: date range scans and customer, location and service lookups
+INDEXED_COLUMNS = ['Date', 'Customer Name', 'Customer Location', 'Service']
+DATE_COLUMN = 'Date'
+USERS_TABLE = 'users'
+# The customer dimension (customers.CustomerIndex); confirmed aliases go in '<table>_aliases'
+CUSTOMERS_TABLE = 'customers'
+CUSTOMER_FIELDS = ['name', 'gender', 'home_location', 'first_visit', 'last_visit', 'served', 'locations']
+
+# Flat files moved into the database by migrate(), and the table each one becomes
+MIGRATIONS = {
+    'daily_activities.csv': 'activities',
+    'extended_weekly_customers.csv': 'activity_history',
+    'cleaned_customers_data.csv': 'cleaned_activities',
+}
+# Legacy files written without a header row, and their columns (recorded before Size was kept)
+HEADERLESS_FILES = {
+    'daily_activities.csv': ['Date', 'Customer Name', 'Customer Location', 'Customer Gender', 'Service', 'Total Amount'],
+}
+CREDENTIALS_FILE = 'user_credentials.json'
+CUSTOMER_INDEX_FILE = 'customers.json'
+MIGRATION_CHUNK_ROWS = 50000
+# The table that replaces each flat file the app reads and writes
+DATA_TABLES = {**MIGRATIONS, CUSTOMER_INDEX_FILE: CUSTOMERS_TABLE}
+
+def table_path(table, db_file=DATABASE_FILE):
+    return f"{db_file}{TABLE_SEPARATOR}{table}"
+
+def selected_database():
+    """The database file chosen with the LAUNDRY_DATABASE setting, or None to use the flat files."""
+    return os.environ.get(DATABASE_SETTING) or None
+
+def data_path(flat_file):
+    """Where the app keeps a flat file's data: its table when a database is selected, the file otherwise."""
+    db_file = selected_database()
+    if db_file and flat_file in DATA_TABLES:
+        return table_path(DATA_TABLES[flat_file], db_file)
+    return flat_file
+
+def is_database_path(path):
+    db_file, separator, table = str(path).rpartition(TABLE_SEPARATOR)
+    return bool(separator and table) and db_file.lower().endswith(DATABASE_SUFFIXES)
+
+def split_path(path):
+    db_file, _, table = str(path).rpartition(TABLE_SEPARATOR)
+    return db_file, table
+
+def quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def connect(db_file=DATABASE_FILE):
+    """A connection in WAL mode, so readers (reports, charts) never block the writer recording activities."""
+    conn = sqlite3.connect(db_file)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+@contextmanager
+def connection(db_file=DATABASE_FILE):
+    """A connection that commits on success and is always closed."""
+    conn = connect(db_file)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def _table_columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({quote(table)})')]
+
+def ensure_indexes(conn, table):
+    for col in INDEXED_COLUMNS:
+        if col in _table_columns(conn, table):
+            name = f"idx_{table}_{col.lower().replace(' ', '_')}"
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {quote(name)} ON {quote(table)} ({quote(col)})')
+
+def table_exists(path):
+    db_file, table = split_path(path)
+    if not os.path.isfile(db_file):
+        return False
+    with connection(db_file) as conn:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone() is not None
+
+def table_version(path):
+    """Changes whenever the database is written (the WAL file takes the writes until a checkpoint)."""
+    db_file, _ = split_path(path)
+    stats = [os.stat(f) for f in (db_file, db_file + '-wal') if os.path.isfile(f)]
+    return tuple((stat.st_mtime_ns, stat.st_size) for stat in stats)
+
+def _select(table, columns=None):
+    selected = '*' if columns is None else ', '.join(quote(col) for col in columns)
+    return f'SELECT {selected} FROM {quote(table)}'
+
+def read_table(path, columns=None):
+    """The whole table, in insertion order."""
+    db_file, table = split_path(path)
+    with connection(db_file) as conn:
+        return pd.read_sql_query(_select(table, columns) + ' ORDER BY rowid', conn)
+
+def write_table(df, path, append=True):
+    """Append to (or replace) a table, creating it and its indexes as needed."""
+    db_file, table = split_path(path)
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            # Same text as the CSV files hold, so range comparisons and round trips agree
+            df[col] = df[col].astype(str).where(df[col].notna(), None)
+    with connection(db_file) as conn:
+        existing = _table_columns(conn, table) if append else []
+        # Columns the table does not have yet are added, earlier rows get NULL
+        for col in df.columns:
+            if existing and col not in existing:
+                conn.execute(f'ALTER TABLE {quote(table)} ADD COLUMN {quote(col)}')
+        df.to_sql(table, conn, if_exists='append' if append else 'replace', index=False)
+        ensure_indexes(conn, table)
+
+def update_rows(path, match_column, updates):
+    """Set columns on the rows whose match_column holds a value: updates is {value: {column: new value}}."""
+    db_file, table = split_path(path)
+    with connection(db_file) as conn:
+        for value, columns in updates.items():
+            assignments = ', '.join(f'{quote(col)} = ?' for col in columns)
+            conn.execute(f'UPDATE {quote(table)} SET {assignments} WHERE {quote(match_column)} = ?',
+                         [*columns.values(), value])
+
+def count_rows(path):
+    db_file, table = split_path(path)
+    with connection(db_file) as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM {quote(table)}').fetchone()[0]
+
+def read_rows(path, offset=0, columns=None):
+    """Rows after the given number of rows, in insertion order."""
+    db_file, table = split_path(path)
+    with connection(db_file) as conn:
+        return pd.read_sql_query(_select(table, columns) + ' ORDER BY rowid LIMIT -1 OFFSET ?', conn, params=(offset,))
+
+def iter_chunks(path, chunksize, columns=None):
+    db_file, table = split_path(path)
+    conn = connect(db_file)
+    try:
+        yield from pd.read_sql_query(_select(table, columns) + ' ORDER BY rowid', conn, chunksize=chunksize)
+    finally:
+        conn.close()
+
+def read_date_range(path, start_date=None, end_date=None, locations=None, columns=None):
+    """Rows between two dates (inclusive) and in the given locations, found through the indexes."""
+    db_file, table = split_path(path)
+    conditions, params = [], []
+    if start_date:
+        conditions.append(f'{quote(DATE_COLUMN)} >= ?')
+        params.append(pd.Timestamp(start_date).strftime('%Y-%m-%d'))
+    if end_date:
+        # Before the next day, so stored timestamps on the end date are included too
+        conditions.append(f'{quote(DATE_COLUMN)} < ?')
+        params.append((pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)).strftime('%Y-%m-%d'))
+    if locations:
+        locations = [locations] if isinstance(locations, str) else list(locations)
+        conditions.append(f"{quote('Customer Location')} IN ({', '.join('?' * len(locations))})")
+        params.extend(locations)
+    query = _select(table, columns)
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    with connection(db_file) as conn:
+        return pd.read_sql_query(query + f' ORDER BY {quote(DATE_COLUMN)}, rowid', conn, params=params)
+
+def load_users(db_file=DATABASE_FILE):
+    if not table_exists(table_path(USERS_TABLE, db_file)):
+        return {}
+    with connection(db_file) as conn:
+        return dict(conn.execute(f'SELECT username, password FROM {USERS_TABLE}'))
+
+def save_users(users, db_file=DATABASE_FILE):
+    with connection(db_file) as conn:
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {USERS_TABLE} (username TEXT PRIMARY KEY, password TEXT NOT NULL)')
+        conn.execute(f'DELETE FROM {USERS_TABLE}')
+        conn.executemany(f'INSERT INTO {USERS_TABLE} (username, password) VALUES (?, ?)', users.items())
+
+def load_credentials(credentials_file=CREDENTIALS_FILE):
+    """Usernames and passwords: the users table of the selected database, or the credentials file."""
+    db_file = selected_database()
+    if db_file:
+        return load_users(db_file)
+    if os.path.isfile(credentials_file):
+        with open(credentials_file, 'r') as f:
+            return json.load(f)
+    return {}
+
+def save_credentials(users, credentials_file=CREDENTIALS_FILE):
+    db_file = selected_database()
+    if db_file:
+        save_users(users, db_file)
+        return
+    with open(credentials_file, 'w') as f:
+        json.dump(users, f, indent=4)
+
+def load_customers(path=table_path(CUSTOMERS_TABLE)):
+    """The customers ({key: entry}) and aliases ({alias: key}) of a customer table."""
+    if not table_exists(path):
+        return {}, {}
+    db_file, table = split_path(path)
+    with connection(db_file) as conn:
+        rows = conn.execute(f'SELECT key, {", ".join(CUSTOMER_FIELDS)} FROM {quote(table)} ORDER BY rowid')
+        customers = {key: dict(zip(CUSTOMER_FIELDS, values)) for key, *values in rows}
+        aliases = dict(conn.execute(f'SELECT alias, key FROM {quote(table + "_aliases")}'))
+    for entry in customers.values():
+        entry['locations'] = json.loads(entry['locations'] or '{}')
+    return customers, aliases
+
+def save_customers(customers, aliases, path=table_path(CUSTOMERS_TABLE)):
+    """Replace the contents of a customer table (one row per customer, visits per location as JSON)."""
+    db_file, table = split_path(path)
+    aliases_table = table + '_aliases'
+    with connection(db_file) as conn:
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {quote(table)} (key TEXT PRIMARY KEY, name TEXT NOT NULL, gender TEXT, '
+                     'home_location TEXT, first_visit TEXT, last_visit TEXT, served INTEGER NOT NULL, locations TEXT)')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {quote(f"idx_{table}_home_location")} ON {quote(table)} (home_location)')
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {quote(aliases_table)} (alias TEXT PRIMARY KEY, key TEXT NOT NULL)')
+        conn.execute(f'DELETE FROM {quote(table)}')
+        conn.execute(f'DELETE FROM {quote(aliases_table)}')
+        rows = ([key] + [entry.get(field) for field in CUSTOMER_FIELDS[:-1]] + [json.dumps(entry.get('locations') or {})]
+                for key, entry in customers.items())
+        placeholders = ', '.join('?' * (len(CUSTOMER_FIELDS) + 1))
+        conn.executemany(f'INSERT INTO {quote(table)} (key, {", ".join(CUSTOMER_FIELDS)}) VALUES ({placeholders})', rows)
+        conn.executemany(f'INSERT INTO {quote(aliases_table)} (alias, key) VALUES (?, ?)', aliases.items())
+
+def migrate(db_file=DATABASE_FILE, migrations=MIGRATIONS, credentials_file=CREDENTIALS_FILE,
+            customer_index_file=CUSTOMER_INDEX_FILE):
+    """Copy the flat files into the database once, replacing tables of the same name.
+
+    CSVs are copied in chunks, so files larger than memory migrate too.
+    Returns {table: rows}.
+    """
+    migrated = {}
+    for csv_file, table in migrations.items():
+        if not os.path.isfile(csv_file):
+            continue
+        rows = 0
+        names = HEADERLESS_FILES.get(os.path.basename(csv_file))
+        for chunk in pd.read_csv(csv_file, chunksize=MIGRATION_CHUNK_ROWS, header=None if names else 'infer', names=names):
+            write_table(chunk, table_path(table, db_file), append=rows > 0)
+            rows += len(chunk)
+        migrated[table] = rows
+    if os.path.isfile(credentials_file):
+        with open(credentials_file, 'r') as f:
+            users = json.load(f)
+        save_users(users, db_file)
+        migrated[USERS_TABLE] = len(users)
+    if os.path.isfile(customer_index_file):
+        with open(customer_index_file, 'r') as f:
+            index = json.load(f)
+        save_customers(index.get('customers', {}), index.get('aliases', {}), table_path(CUSTOMERS_TABLE, db_file))
+        migrated[CUSTOMERS_TABLE] = len(index.get('customers', {}))
+    return migrated
+
+if __name__ == "__main__":
+    # One-shot migration of the flat files: python database.py migrate [laundry.db]
+    if len(sys.argv) >= 2 and sys.argv[1] == 'migrate':
+        db_file = sys.argv[2] if len(sys.argv) > 2 else DATABASE_FILE
+        for table, rows in migrate(db_file).items():
+            print(f"{table}: {rows} rows -> {table_path(table, db_file)}")
+        print(f"Set {DATABASE_SETTING}={db_file} to run the app on the database.")
+    else:
+        print("Usage: python database.py migrate [database file]")
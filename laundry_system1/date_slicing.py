@@ -0,0 +1,82 @@
+import os
+
+import pandas as pd
+
+import database
+from activity_store import read_table, table_exists
+from cleaning_data import CLEANED_DATA_FILE
+
+DATE_COLUMN = 'Date'
+LOCATION_COLUMN = 'Customer Location'
+
+# Date-indexed frames kept in memory, keyed by (absolute path, mtime, size)
+_loaded = {}
+
+def is_date_sorted(index):
+    """Whether an index is a DatetimeIndex sorted ascending with any NaT last."""
+    if not isinstance(index, pd.DatetimeIndex):
+        return False
+    valid = len(index) - int(index.isna().sum())
+    return index[:valid].is_monotonic_increasing and not index[:valid].hasnans
+
+def index_by_date(df, date_column=DATE_COLUMN):
+    """The frame sorted on a DatetimeIndex of its (parsed once) dates; already sorted frames are returned as is.
+
+    Rows without a valid date sort last. The index is left unnamed so the
+    date column stays unambiguous for groupby.
+    """
+    if is_date_sorted(df.index):
+        return df
+    dates = pd.to_datetime(df[date_column], errors='coerce')
+    indexed = df.assign(**{date_column: dates}).set_index(pd.DatetimeIndex(dates).rename(None), drop=False)
+    if not is_date_sorted(indexed.index):
+        indexed = indexed.sort_index(kind='stable', na_position='last')
+    return indexed
+
+def date_bounds(dates, start_date=None, end_date=None):
+    """Positions [start, stop) of an inclusive date range in sorted dates (NaT last), by binary search."""
+    valid = len(dates) - int(dates.isna().sum())
+    dates = dates[:valid]
+    start = dates.searchsorted(pd.Timestamp(start_date), side='left') if start_date else 0
+    stop = dates.searchsorted(pd.Timestamp(end_date), side='right') if end_date else valid
+    return start, max(start, stop)
+
+def slice_frame(df, start_date=None, end_date=None, locations=None):
+    """Rows between two dates (inclusive) and, optionally, in the given locations.
+
+    The date range is a binary search on the sorted index and the result a
+    positional slice (a view, not a copy); the location filter only masks
+    the rows of that slice.
+    """
+    df = index_by_date(df)
+    if start_date or end_date:
+        start, stop = date_bounds(df.index, start_date, end_date)
+        df = df.iloc[start:stop]
+    if locations:
+        df = df[df[LOCATION_COLUMN].isin([locations] if isinstance(locations, str) else locations)]
+    return df
+
+def load_indexed(data_file=CLEANED_DATA_FILE):
+    """The data file as a date-indexed frame, parsed and sorted once per version of the file."""
+    if not table_exists(data_file):
+        raise FileNotFoundError(f"Data file '{data_file}' not found.")
+    if database.is_database_path(data_file):
+        version = database.table_version(data_file)
+    else:
+        stat = os.stat(data_file)
+        version = (stat.st_mtime_ns, stat.st_size)
+    key = (os.path.abspath(data_file), version)
+    if key not in _loaded:
+        # Drop stale entries for the same file
+        for stale in [k for k in _loaded if k[0] == key[0]]:
+            del _loaded[stale]
+        _loaded[key] = index_by_date(read_table(data_file))
+    return _loaded[key]
+
+def load_range(data_file, start_date=None, end_date=None, locations=None):
+    """Activities in a date range and locations: an indexed query on a database table, a slice of the loaded data otherwise."""
+    if database.is_database_path(data_file):
+        if not table_exists(data_file):
+            raise FileNotFoundError(f"Data file '{data_file}' not found.")
+        return index_by_date(database.read_date_range(data_file, start_date, end_date, locations))
+    return slice_frame(load_indexed(data_file), start_date, end_date, locations)
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import time
+
+class DiskCache:
+    """Directory of cached files with LRU, size and age limits.
+
+    Each entry is one file named by the hash of its key. A hit touches the
+    file's mtime, so the mtime doubles as the last-use time for LRU
+    eviction; entries are written to a temporary file and renamed in, so
+    concurrent readers never see a partial file. No index is kept, which
+    lets several processes share one cache directory.
+    """
+
+    def __init__(self, root, max_bytes=None, max_entries=None, max_age=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_age = max_age
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha256(json.dumps(parts, default=str, sort_keys=True).encode()).hexdigest()
+
+    def path(self, key, suffix=''):
+        return os.path.join(self.root, key + suffix)
+
+    def get(self, key, suffix=''):
+        """Path of a fresh cached entry (marking it as recently used) or None."""
+        path = self.path(key, suffix)
+        try:
+            if self.max_age is not None and time.time() - os.path.getmtime(path) > self.max_age:
+                os.remove(path)
+                return None
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, write, suffix=''):
+        """Store an entry; write(path) must create the file at the given temporary path."""
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(key, suffix)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def entries(self):
+        """(path, size, mtime) for every entry, least recently used first."""
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict(self):
+        entries = self.entries()
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+        for path, size, mtime in entries:
+            expired = self.max_age is not None and now - mtime > self.max_age
+            over_size = self.max_bytes is not None and total > self.max_bytes
+            over_count = self.max_entries is not None and count > self.max_entries
+            if not (expired or over_size or over_count):
+                # Entries are oldest first, later ones are newer and within the limits
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            count -= 1
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -2,28 +2,19 @@ import tkinter as tk
 from tkinter import messagebox, simpledialog
 from PIL import Image, ImageTk
 from datetime import datetime
-import json
-import os
-import pandas as pd
-import visualizing_data
-from collecting_data import record_activity
-from training import train_model
+import database
+from dashboard import open_dashboard
+from collecting_data import record_activities_bulk
+from pricing import normalize_services, requires_size
+from training_scheduler import TrainingScheduler
 from reporting import generate_report
 
-# File to store user credentials
-CREDENTIALS_FILE = "user_credentials.json"
-
-# Load user credentials from the file
+# User credentials: the users table when a database is selected, user_credentials.json otherwise
 def load_users():
-    if os.path.exists(CREDENTIALS_FILE):
-        with open(CREDENTIALS_FILE, "r") as file:
-            return json.load(file)
-    return {}
+    return database.load_credentials()
 
-# Save user credentials to the file
 def save_users(users):
-    with open(CREDENTIALS_FILE, "w") as file:
-        json.dump(users, file, indent=4)
+    database.save_credentials(users)
 
 def validate_date(date_str):
     try:
@@ -43,6 +34,8 @@ class LaundryManagementApp:
         self.loading_icon = self.load_image(r"C:\Users\Admin\Downloads\loading animation.webp")
 
         self.main_menu_frame = None
+        self.training_scheduler = TrainingScheduler()
+        self.dashboard = None
         self.show_login_screen()
 
     def load_image(self, file_name):
@@ -84,8 +77,10 @@ class LaundryManagementApp:
         MainMenuFrame(self.root, self).pack(expand=True, fill=tk.BOTH)
 
     def clear_window(self):
+        # Separate windows (the dashboard, reports) outlive navigation in the main window
         for widget in self.root.winfo_children():
-            widget.destroy()
+            if not isinstance(widget, tk.Toplevel):
+                widget.destroy()
 
     def record_activity(self):
         loading_window = self.show_loading_icon()
@@ -107,39 +102,46 @@ class LaundryManagementApp:
                 self.hide_loading_icon(loading_window)
                 return
 
-            service = simpledialog.askstring("Record Activity", "Enter service type (Dry Cleaning, Duvet/Blanket Cleaning, Clothes Cleaning):").strip().capitalize()
-            service_dict = {
-                "Dry Cleaning": 500,
-                "Duvet/Blanket Cleaning": ["Small", "Medium", "Large"],
-                "Clothes Cleaning": ["Small", "Medium", "Large"]
-            }
-
-            if service not in service_dict:
+            service = normalize_services([simpledialog.askstring("Record Activity", "Enter service type (Dry Cleaning, Duvet/Blanket Cleaning, Clothes Cleaning):")])[0]
+            if not isinstance(service, str):
                 messagebox.showwarning("Warning", "Invalid service type. Please enter 'Dry Cleaning', 'Duvet/Blanket Cleaning', or 'Clothes Cleaning'.")
                 self.hide_loading_icon(loading_window)
                 return
 
-            if service in ["Duvet/Blanket Cleaning", "Clothes Cleaning"]:
+            size = ""
+            if requires_size(service):
                 size = simpledialog.askstring("Record Activity", "Enter size (Small, Medium, Large):").strip().capitalize()
-                if size not in service_dict[service]:
+                if size not in ["Small", "Medium", "Large"]:
                     messagebox.showwarning("Warning", "Invalid size. Please enter 'Small', 'Medium', or 'Large'.")
                     self.hide_loading_icon(loading_window)
                     return
-                amount = {"Small": 200, "Medium": 350, "Large": 500}[size] if service == "Duvet/Blanket Cleaning" else {"Small": 300, "Medium": 400, "Large": 600}[size]
-            else:
-                amount = 500
 
             ironing = simpledialog.askstring("Record Activity", "Was ironing included? (yes/no):").strip().lower()
-            if ironing == "yes":
-                amount += 200
-            elif ironing != "no":
+            if ironing not in ["yes", "no"]:
                 messagebox.showwarning("Warning", "Invalid input for ironing. Please enter 'yes' or 'no'.")
                 self.hide_loading_icon(loading_window)
                 return
 
-            record_activity(date_str, customer_name, customer_location, customer_gender, service, amount)
-            train_model()  # Train model with the new data
-            messagebox.showinfo("Success", "Activity recorded and model trained successfully!")
+            activity = {
+                "Date": date_str,
+                "Customer Name": customer_name,
+                "Customer Location": customer_location,
+                "Customer Gender": customer_gender,
+                "Service": service,
+                "Size": size,
+                "Ironing": ironing
+            }
+            accepted, rejects = record_activities_bulk([activity])
+            if accepted is None or accepted.empty:
+                reason = rejects["Reason"].iloc[0] if rejects is not None and not rejects.empty else "The activity could not be saved."
+                messagebox.showwarning("Warning", reason)
+                self.hide_loading_icon(loading_window)
+                return
+
+            self.training_scheduler.notify()  # Retrain in the background once enough activities arrive
+            if self.dashboard is not None and self.dashboard.winfo_exists():
+                self.dashboard.add_activities(accepted)
+            messagebox.showinfo("Success", "Activity recorded successfully! The model will be retrained in the background.")
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {e}")
         finally:
@@ -179,11 +181,11 @@ class LaundryManagementApp:
 
     def _visualize_data(self, loading_window):
         try:
-            period = simpledialog.askstring("Visualization", "Enter the period for visualization (daily/weekly/monthly/yearly):")
-            if period:
-                df = pd.read_csv('cleaned_customers_data.csv')
-                visualizing_data.visualize_data(df, period)
-                messagebox.showinfo("Success", "Data visualization successful!")
+            # One live dashboard window, kept open and updated as activities are recorded
+            if self.dashboard is not None and self.dashboard.winfo_exists():
+                self.dashboard.winfo_toplevel().lift()
+            else:
+                self.dashboard = open_dashboard(self.root)
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred while visualizing data: {e}")
         finally:
@@ -205,6 +207,7 @@ class LaundryManagementApp:
         loading_window.destroy()
 
     def exit_app(self):
+        self.training_scheduler.shutdown()
         self.root.quit()
 
 class LoginFrame(tk.Frame):
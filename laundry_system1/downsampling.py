@@ -0,0 +1,85 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Points drawn per line and bars per bar chart, whatever the length of the history
+MAX_PLOT_POINTS = 500
+MAX_PLOT_BARS = 60
+
+def _positions(index):
+    """Numeric x positions for an index (nanoseconds for dates)."""
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype(np.float64)
+    values = pd.to_numeric(pd.Series(index), errors='coerce').to_numpy(dtype=np.float64)
+    return np.where(np.isnan(values), np.arange(len(index), dtype=np.float64), values)
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: positions of the threshold points that keep the shape.
+
+    The first and last points are kept; from every bucket in between the
+    point forming the largest triangle with the previous pick and the next
+    bucket's average is chosen.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_start = end
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_end = max(next_end, next_start + 1)
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def minmax_indices(y, buckets):
+    """Positions of the minimum and maximum of each of the given number of equal buckets."""
+    n = len(y)
+    if 2 * buckets >= n:
+        return np.arange(n)
+    bucket_ids = np.arange(n) * buckets // n
+    values = pd.Series(y)
+    grouped = values.groupby(bucket_ids)
+    return np.unique(np.concatenate([grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy(), [0, n - 1]]))
+
+def downsample(series, max_points=MAX_PLOT_POINTS, method='lttb'):
+    """At most max_points of a series for line plots ('lttb' or 'minmax' bucketing)."""
+    series = series.dropna()
+    if max_points is None or len(series) <= max_points:
+        return series
+    y = series.to_numpy(dtype=np.float64)
+    if method == 'lttb':
+        positions = lttb_indices(_positions(series.index), y, max_points)
+    elif method == 'minmax':
+        positions = minmax_indices(y, max_points // 2)
+    else:
+        raise ValueError("Invalid downsampling method. Choose from 'lttb' or 'minmax'.")
+    return series.iloc[positions]
+
+def downsample_groups(frame, x, y, group, max_points=MAX_PLOT_POINTS, method='lttb'):
+    """Downsample a long frame per group, each group getting at most max_points points."""
+    if max_points is None or len(frame) <= max_points:
+        return frame
+    parts = []
+    for key, part in frame.groupby(group, sort=False):
+        series = downsample(part.set_index(x)[y], max_points, method)
+        parts.append(series.reset_index().assign(**{group: key}))
+    return pd.concat(parts, ignore_index=True)[list(frame.columns)]
+
+def rebin(series, max_points=MAX_PLOT_BARS, how='sum'):
+    """Merge consecutive dates into equal day buckets so a bar chart gets at most max_points bars.
+
+    Unlike point picking this keeps every amount, which is what bar heights show.
+    """
+    if max_points is None or len(series) <= max_points:
+        return series
+    days = (series.index.max() - series.index.min()).days + 1
+    width = math.ceil(days / max_points)
+    return series.resample(f'{width}D', label='left', closed='left').agg(how)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from disk_cache import DiskCache
+from model_registry import REGISTRY_DIR, ModelRegistry
+from training import CATEGORICAL_FEATURES, NUMERIC_FEATURES
+
+FORECAST_DAYS = 30
+FORECAST_SIZES = ['Small', 'Medium', 'Large']
+SEGMENT_COLUMNS = ['Service', 'Size', 'Customer Gender', 'Customer Location']
+# Rows per model.predict call, bounds the memory of the encoded matrix
+PREDICT_CHUNK_ROWS = 100000
+
+FORECAST_CACHE_DIR = '.forecast_cache'
+FORECAST_CACHE_MAX_BYTES = 200 * 1024 * 1024
+FORECAST_CACHE_MAX_ENTRIES = 64
+
+forecast_cache = DiskCache(FORECAST_CACHE_DIR, max_bytes=FORECAST_CACHE_MAX_BYTES,
+                           max_entries=FORECAST_CACHE_MAX_ENTRIES)
+
+def segment_values(df, column):
+    """Sorted distinct non-null values of a column, the forecast's levels for it."""
+    return sorted(pd.unique(df[column].dropna().astype(str)))
+
+def build_forecast_grid(start, days=FORECAST_DAYS, services=(), sizes=FORECAST_SIZES, genders=(), locations=()):
+    """Every date x service x size x gender x location combination as raw model input.
+
+    The grid comes from one MultiIndex product, so its cost grows with the
+    number of rows only, not with Python loops over the segments.
+    """
+    dates = pd.date_range(start=pd.Timestamp(start).normalize(), periods=days)
+    index = pd.MultiIndex.from_product([dates, services, sizes, genders, locations],
+                                       names=['Date'] + SEGMENT_COLUMNS)
+    grid = index.to_frame(index=False)
+    grid['Day'] = grid['Date'].dt.day
+    grid['Month'] = grid['Date'].dt.month
+    grid['Year'] = grid['Date'].dt.year
+    return grid
+
+def predict_in_chunks(model, frame, chunk_rows=PREDICT_CHUNK_ROWS):
+    """Run the raw frame through the saved pipeline (preprocessor included) chunk by chunk."""
+    features = frame[NUMERIC_FEATURES + CATEGORICAL_FEATURES]
+    if features.empty:
+        return np.array([])
+    return np.concatenate([model.predict(features.iloc[start:start + chunk_rows])
+                           for start in range(0, len(features), chunk_rows)])
+
+def forecast_demand(df, days=FORECAST_DAYS, start=None, locations=None, model=None, model_version=None,
+                    registry_dir=REGISTRY_DIR, use_cache=True, chunk_rows=PREDICT_CHUNK_ROWS):
+    """Per-day, per-segment predicted amounts for the days after the last activity.
+
+    Segments are the services, genders and locations seen in df (or the
+    given locations) crossed with FORECAST_SIZES. Results are cached on
+    disk by (model version with its data fingerprint and training time,
+    start, horizon, segments); the model is only loaded on a miss. Without a registry version (a legacy model.pkl or a
+    model passed in without model_version) nothing is cached.
+    """
+    if start is None:
+        start = pd.to_datetime(df['Date']).max() + pd.Timedelta(days=1)
+    if pd.isna(start):
+        raise ValueError("No dated activities to forecast from.")
+    start = pd.Timestamp(start).normalize()
+    segments = {
+        'services': segment_values(df, 'Service'),
+        'sizes': FORECAST_SIZES,
+        'genders': segment_values(df, 'Customer Gender'),
+        'locations': segment_values(df, 'Customer Location') if locations is None
+        else sorted(pd.unique(pd.Series(locations).dropna().astype(str)))
+    }
+
+    registry = ModelRegistry(registry_dir)
+    if model is None:
+        model_version = registry.current_version()
+    key = None
+    if use_cache and model_version is not None:
+        # Version names restart if models/ is cleared, so the key also holds what the version was trained on and when
+        metadata = registry.metadata(model_version) or {}
+        key = DiskCache.make_key('forecast', model_version, metadata.get('data_fingerprint'), metadata.get('trained_at'),
+                                 str(start.date()), days, segments)
+        path = forecast_cache.get(key, '.pkl')
+        if path:
+            return pd.read_pickle(path)
+
+    if model is None:
+        model = registry.load_model(model_version)
+    grid = build_forecast_grid(start, days, **segments)
+    grid['Predicted Amount'] = predict_in_chunks(model, grid, chunk_rows)
+    if key:
+        forecast_cache.put(key, grid.to_pickle, '.pkl')
+    return grid
@@ -1,22 +1,14 @@
 import tkinter as tk
 from tkinter import messagebox
-import json
-import os
 
-# File to store user credentials
-CREDENTIALS_FILE = "user_credentials.json"
+import database
 
-# Load user credentials from the file
+# User credentials: the users table when a database is selected, user_credentials.json otherwise
 def load_users():
-    if os.path.exists(CREDENTIALS_FILE):
-        with open(CREDENTIALS_FILE, "r") as file:
-            return json.load(file)
-    return {}
+    return database.load_credentials()
 
-# Save user credentials to the file
 def save_users(users):
-    with open(CREDENTIALS_FILE, "w") as file:
-        json.dump(users, file)
+    database.save_credentials(users)
 
 # Show login screen
 def show_login_screen(on_success):
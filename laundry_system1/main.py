@@ -1,10 +1,13 @@
-import pandas as pd
+from activity_store import read_table
+from cleaning_data import CLEANED_DATA_FILE
 from collecting_data import record_activity
-from training import train_model  # Import the train_model function
+from training_scheduler import TrainingScheduler
 from reporting import generate_report
 import visualizing_data
 
 def main_menu():
+    # Retraining runs in the background so recording never waits on it
+    scheduler = TrainingScheduler()
     while True:
         print("\nMain Menu")
         print("1. Record Daily Activity")
@@ -16,23 +19,25 @@ def main_menu():
 
         if choice == '1':
             record_activity()
-            print("Training model with the new data...")
-            train_model()  # Automatically train the model after recording activity
-            print("Model training completed successfully.")
+            scheduler.notify()
+            print("The model will be retrained in the background.")
         elif choice == '2':
             generate_report()
         elif choice == '3':
             visualize_data_menu()
         elif choice == '4':
             print("Exiting the system.")
+            if scheduler.pending_rows or scheduler.is_training:
+                print("Finishing background model training...")
+            scheduler.shutdown()
             break
         else:
             print("Invalid choice. Please enter a number between 1 and 4.")
 
-def visualize_data_menu():
+def visualize_data_menu(data_file=CLEANED_DATA_FILE):
     while True:
         try:
-            df = pd.read_csv('cleaned_customers_data.csv')
+            df = read_table(data_file)
             period = input("Enter the period for visualization (daily/weekly/monthly/yearly) or 'b' to go back: ").strip().lower()
 
             if period == 'b':
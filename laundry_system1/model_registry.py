@@ -0,0 +1,141 @@
+import json
+import os
+import shutil
+import sys
+
+import joblib
+
+REGISTRY_DIR = 'models'
+CURRENT_FILE = 'CURRENT'
+METADATA_FILE = 'metadata.json'
+MODEL_FILE = 'model.pkl'
+ENCODER_FILE = 'encoder.pkl'
+# Versions kept after each training run (for rollback); older ones are deleted
+KEEP_VERSIONS = 5
+
+# Loaded artifacts shared by every caller in this process, keyed by file path and mtime
+_loaded = {}
+
+class ModelRegistry:
+    """Versioned store for trained models.
+
+    Each training run publishes a new version directory holding the model,
+    the encoder and a metadata.json (training rows, data fingerprint,
+    metrics, timings). The CURRENT file names the version in use and is
+    swapped atomically, so readers always see a complete version. Before
+    the first publish the legacy model.pkl/encoder.pkl next to the data are
+    served instead.
+    """
+
+    def __init__(self, root=REGISTRY_DIR, legacy_dir='.'):
+        self.root = root
+        self.legacy_dir = legacy_dir
+
+    def versions(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if name.startswith('v') and not name.endswith('.tmp')
+                      and os.path.isdir(os.path.join(self.root, name)))
+
+    def current_version(self):
+        current_path = os.path.join(self.root, CURRENT_FILE)
+        if not os.path.isfile(current_path):
+            return None
+        with open(current_path, 'r') as f:
+            return f.read().strip() or None
+
+    def set_current(self, version):
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        current_path = os.path.join(self.root, CURRENT_FILE)
+        tmp_path = current_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, current_path)
+
+    def publish(self, model, encoder, metadata, make_current=True):
+        """Write a new version and (by default) point CURRENT at it."""
+        versions = self.versions()
+        version = f"v{int(versions[-1][1:]) + 1 if versions else 1:06d}"
+        tmp_dir = os.path.join(self.root, version + '.tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        # Uncompressed dumps keep the tree arrays memory-mappable
+        joblib.dump(model, os.path.join(tmp_dir, MODEL_FILE))
+        joblib.dump(encoder, os.path.join(tmp_dir, ENCODER_FILE))
+        with open(os.path.join(tmp_dir, METADATA_FILE), 'w') as f:
+            json.dump(dict(metadata, version=version), f, indent=4)
+        os.replace(tmp_dir, os.path.join(self.root, version))
+
+        if make_current:
+            self.set_current(version)
+        return version
+
+    def _artifact_path(self, artifact, version=None):
+        version = version or self.current_version()
+        if version is None:
+            return os.path.join(self.legacy_dir, artifact)
+        return os.path.join(self.root, version, artifact)
+
+    def metadata(self, version=None):
+        """Metadata of a version (the current one by default), None before the first publish."""
+        path = self._artifact_path(METADATA_FILE, version)
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def load(self, artifact, version=None, mmap=True, cache=True):
+        """Load an artifact once per process, memory-mapping its numpy arrays.
+
+        Memory-mapped arrays are read-only and backed by the page cache, so
+        processes serving the same version share one copy of the forest.
+        Pass cache=False (and mmap=False) for a private copy to modify.
+        """
+        path = self._artifact_path(artifact, version)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"No trained model found at '{path}'. Train a model first.")
+        key = (os.path.abspath(path), os.path.getmtime(path), mmap)
+        if cache and key in _loaded:
+            return _loaded[key]
+
+        obj = joblib.load(path, mmap_mode='r' if mmap else None)
+        if cache:
+            # Drop stale entries for the same file (e.g. a retrained legacy model.pkl)
+            for stale in [k for k in _loaded if k[0] == key[0]]:
+                del _loaded[stale]
+            _loaded[key] = obj
+        return obj
+
+    def load_model(self, version=None, mmap=True, cache=True):
+        return self.load(MODEL_FILE, version, mmap, cache)
+
+    def load_encoder(self, version=None, mmap=True, cache=True):
+        return self.load(ENCODER_FILE, version, mmap, cache)
+
+    def prune(self, keep=KEEP_VERSIONS):
+        """Delete all but the newest versions, never the current one."""
+        current = self.current_version()
+        for version in self.versions()[:-keep]:
+            if version != current:
+                shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
+
+def load_current_model(root=REGISTRY_DIR):
+    """The model behind the CURRENT pointer, loaded lazily and cached in-process."""
+    return ModelRegistry(root).load_model()
+
+def load_current_encoder(root=REGISTRY_DIR):
+    return ModelRegistry(root).load_encoder()
+
+if __name__ == "__main__":
+    registry = ModelRegistry()
+    if len(sys.argv) == 3 and sys.argv[1] == 'rollback':
+        registry.set_current(sys.argv[2])
+        print(f"Current model set to {sys.argv[2]}")
+    else:
+        current = registry.current_version()
+        for version in registry.versions():
+            metadata = registry.metadata(version) or {}
+            marker = '*' if version == current else ' '
+            print(f"{marker} {version}  rows={metadata.get('rows_trained')}  "
+                  f"cv_mse={metadata.get('validation_mse')}  trained_at={metadata.get('trained_at')}")
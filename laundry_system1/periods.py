@@ -0,0 +1,49 @@
+import re
+
+import pandas as pd
+
+# Named periods and the resample rule whose bins start on the period's first day
+PERIODS = {'daily': 'D', 'weekly': 'W-MON', 'monthly': 'MS', 'quarterly': 'QS', 'yearly': 'YS'}
+
+def period_rule(period):
+    """Resample rule for a named period or a pandas offset such as '3D' or '2W'."""
+    if period in PERIODS:
+        return PERIODS[period]
+    rule = str(period).strip().upper()
+    # Weeks start on Monday, as in the named weekly period
+    if re.fullmatch(r'\d*W', rule):
+        rule += '-MON'
+    try:
+        pd.tseries.frequencies.to_offset(rule)
+    except ValueError:
+        raise ValueError(f"Invalid period specified. Choose from {', '.join(PERIODS)} "
+                         f"or an offset such as '3D' or '2W'.") from None
+    return rule
+
+def aggregate_by_period(df, period='daily', value='Total Amount', date_column='Date', how='sum',
+                        by=None, rolling=None, rolling_how='mean'):
+    """Time-indexed frame of a value aggregated per period.
+
+    Rows are binned on a sorted DatetimeIndex with resample, labelled by
+    the first day of each bin; periods without activity are included. With
+    by the groups become columns. rolling adds a '<value> (rolling <window>)'
+    column over that many periods (an int) or a time span ('28D').
+    """
+    dates = pd.to_datetime(df[date_column])
+    rule = period_rule(period)
+    if by is None:
+        series = pd.Series(df[value].to_numpy(), index=pd.DatetimeIndex(dates), name=value)
+        if not series.index.is_monotonic_increasing:
+            series = series.sort_index()
+        frame = series.resample(rule, label='left', closed='left').agg(how).to_frame(value)
+    else:
+        grouper = pd.Grouper(key=date_column, freq=rule, label='left', closed='left')
+        frame = (df.assign(**{date_column: dates})
+                 .groupby([grouper, by], observed=True)[value].agg(how).unstack(by))
+        frame = frame.asfreq(rule, fill_value=0) if how in ('sum', 'count', 'size') else frame.asfreq(rule)
+        frame.columns.name = by
+    frame.index.name = date_column
+
+    if rolling is not None and by is None:
+        frame[f'{value} (rolling {rolling})'] = frame[value].rolling(rolling, min_periods=1).agg(rolling_how)
+    return frame
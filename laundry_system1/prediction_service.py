@@ -0,0 +1,229 @@
+import asyncio
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from forecasting import FORECAST_DAYS, forecast_demand
+from model_registry import REGISTRY_DIR, ModelRegistry
+from training import CATEGORICAL_FEATURES, NUMERIC_FEATURES
+
+HOST = '127.0.0.1'
+PORT = 8765
+SOCKET_PATH = 'prediction.sock'
+# Requests arriving within this window (seconds) share one model.predict call
+BATCH_WINDOW = 0.005
+MAX_BATCH_ROWS = 10000
+# How often (seconds) the registry CURRENT pointer is checked for a new model
+RELOAD_CHECK_INTERVAL = 1.0
+MAX_REQUEST_BYTES = 10 * 1024 * 1024
+
+def prepare_features(frame):
+    """Shape raw rows (with a Date or with Day/Month/Year) into the model's input columns.
+
+    Day, Month and Year are converted to numbers here, so a malformed request
+    is rejected on its own rather than failing the micro-batch it joins.
+    """
+    frame = pd.DataFrame(frame)
+    if 'Date' in frame.columns and not set(NUMERIC_FEATURES) <= set(frame.columns):
+        dates = pd.to_datetime(frame['Date'], errors='coerce')
+        frame = frame.assign(Day=dates.dt.day, Month=dates.dt.month, Year=dates.dt.year)
+    missing = set(NUMERIC_FEATURES + CATEGORICAL_FEATURES) - set(frame.columns)
+    if missing:
+        raise ValueError(f"Columns are missing: {missing}")
+    features = frame[NUMERIC_FEATURES + CATEGORICAL_FEATURES].copy()
+    for col in NUMERIC_FEATURES:
+        try:
+            features[col] = pd.to_numeric(features[col])
+        except (ValueError, TypeError):
+            raise ValueError(f"Column '{col}' holds numbers, got non-numeric values.") from None
+    return features
+
+class PredictionService:
+    """Keeps the current model resident and answers prediction requests.
+
+    predict_batch() serves in-process callers directly. Concurrent async
+    requests are queued and merged into a single model.predict call per
+    BATCH_WINDOW. When the registry's CURRENT pointer moves, the next
+    request picks up the new version without restarting the service.
+    """
+
+    def __init__(self, registry_dir=REGISTRY_DIR, batch_window=BATCH_WINDOW, max_batch_rows=MAX_BATCH_ROWS):
+        self.registry = ModelRegistry(registry_dir)
+        self.batch_window = batch_window
+        self.max_batch_rows = max_batch_rows
+        self.model = None
+        self.version = None
+        self.checked_at = None
+        self.queue = None
+        self.batcher = None
+
+    def current_model(self):
+        """The resident model, reloaded when the registry points at a new version."""
+        now = time.monotonic()
+        if self.model is None or now - self.checked_at >= RELOAD_CHECK_INTERVAL:
+            self.checked_at = now
+            version = self.registry.current_version()
+            if self.model is None or version != self.version:
+                self.model = self.registry.load_model(version)
+                if self.version is not None:
+                    print(f"Prediction service reloaded model {version}.")
+                self.version = version
+        return self.model
+
+    def predict_batch(self, frame):
+        """Predict the total amount for every row of a frame in one call."""
+        features = prepare_features(frame)
+        if features.empty:
+            return np.array([])
+        return self.current_model().predict(features)
+
+    def forecast(self, df, days=FORECAST_DAYS, start=None, locations=None):
+        """Per-day, per-segment forecast with the resident model, served from the forecast cache."""
+        model = self.current_model()
+        return forecast_demand(df, days, start, locations, model=model, model_version=self.version,
+                               registry_dir=self.registry.root)
+
+    async def predict_async(self, frame):
+        """Queue rows for the next micro-batch and wait for their predictions."""
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+            self.batcher = asyncio.create_task(self._run_batches())
+        features = prepare_features(frame)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((features, future))
+        return await future
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            rows = len(batch[0][0])
+            deadline = loop.time() + self.batch_window
+            while rows < self.max_batch_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                rows += len(item[0])
+
+            frames = [features for features, _ in batch]
+            try:
+                # Predict off the event loop so new requests keep queueing meanwhile
+                predictions = await loop.run_in_executor(None, self.predict_batch, pd.concat(frames, ignore_index=True))
+            except Exception as e:
+                if len(batch) == 1:
+                    if not batch[0][1].done():
+                        batch[0][1].set_exception(e)
+                    continue
+                # Retry the members one at a time, so only the request that fails gets the error
+                for features, future in batch:
+                    try:
+                        result = await loop.run_in_executor(None, self.predict_batch, features)
+                    except Exception as member_error:
+                        if not future.done():
+                            future.set_exception(member_error)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+                continue
+            offsets = np.cumsum([0] + [len(features) for features in frames])
+            for (_, future), start, end in zip(batch, offsets[:-1], offsets[1:]):
+                if not future.done():
+                    future.set_result(predictions[start:end])
+
+    async def handle_request(self, reader, writer):
+        """Minimal HTTP/1.1: POST /predict with {"rows": [...]}, GET /health."""
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', 0))
+            if len(request_line) < 2:
+                status, body = 400, {'error': 'Malformed request.'}
+            elif length > MAX_REQUEST_BYTES:
+                status, body = 413, {'error': 'Request too large.'}
+            elif request_line[:2] == ['GET', '/health']:
+                self.current_model()
+                status, body = 200, {'status': 'ok', 'version': self.version}
+            elif request_line[:2] == ['POST', '/predict']:
+                payload = json.loads(await reader.readexactly(length) if length else b'{}')
+                predictions = await self.predict_async(pd.DataFrame(payload.get('rows', [])))
+                status, body = 200, {'version': self.version, 'predictions': [float(p) for p in predictions]}
+            else:
+                status, body = 404, {'error': 'Not found.'}
+        except (ValueError, KeyError) as e:
+            status, body = 400, {'error': str(e)}
+        except Exception as e:
+            status, body = 500, {'error': str(e)}
+
+        data = json.dumps(body).encode()
+        writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                     f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + data)
+        await writer.drain()
+        writer.close()
+
+    async def serve(self, host=HOST, port=PORT, unix_path=None):
+        """Serve until cancelled, on a Unix socket when unix_path is given, else on host:port."""
+        self.current_model()
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_request, path=unix_path)
+            print(f"Prediction service listening on {unix_path} (model {self.version})")
+        else:
+            server = await asyncio.start_server(self.handle_request, host, port)
+            print(f"Prediction service listening on http://{host}:{port} (model {self.version})")
+        async with server:
+            await server.serve_forever()
+
+_service = None
+
+def predict_batch(frame, registry_dir=REGISTRY_DIR):
+    """In-process predictions through a shared, resident PredictionService."""
+    global _service
+    if _service is None or _service.registry.root != registry_dir:
+        _service = PredictionService(registry_dir)
+    return _service.predict_batch(frame)
+
+async def request_predictions(rows, host=HOST, port=PORT, unix_path=None):
+    """Client for a running service: returns (version, predictions) for a list of row dicts."""
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    data = json.dumps({'rows': rows}, default=str).encode()
+    writer.write(f"POST /predict HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    result = json.loads(body)
+    if not head.startswith(b'HTTP/1.1 200'):
+        raise ValueError(result.get('error', 'Prediction request failed.'))
+    return result['version'], result['predictions']
+
+if __name__ == "__main__":
+    # python prediction_service.py [--unix [path]] [--port N]
+    unix_path = None
+    port = PORT
+    if '--unix' in sys.argv:
+        i = sys.argv.index('--unix')
+        unix_path = sys.argv[i + 1] if i + 1 < len(sys.argv) and not sys.argv[i + 1].startswith('--') else SOCKET_PATH
+    if '--port' in sys.argv:
+        port = int(sys.argv[sys.argv.index('--port') + 1])
+    try:
+        asyncio.run(PredictionService().serve(port=port, unix_path=unix_path))
+    except KeyboardInterrupt:
+        print("Prediction service stopped.")
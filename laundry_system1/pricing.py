@@ -0,0 +1,135 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+PRICE_LIST_FILE = 'price_lists.json'
+
+SERVICES = ["Dry Cleaning", "Duvet/Blanket Cleaning", "Clothes Cleaning"]
+# '' is the size slot for flat-rate services that are not priced by size
+SIZES = ["", "Small", "Medium", "Large"]
+SIZED_SERVICES = ["Duvet/Blanket Cleaning", "Clothes Cleaning"]
+
+# Accepted spellings (case-insensitive) for each canonical service name
+SERVICE_ALIASES = {
+    "dry cleaning": "Dry Cleaning",
+    "dry": "Dry Cleaning",
+    "duvet/blanket cleaning": "Duvet/Blanket Cleaning",
+    "duvet/blanket": "Duvet/Blanket Cleaning",
+    "duvet": "Duvet/Blanket Cleaning",
+    "blanket": "Duvet/Blanket Cleaning",
+    "clothes cleaning": "Clothes Cleaning",
+    "clothes": "Clothes Cleaning"
+}
+
+DEFAULT_EFFECTIVE_DATE = "2024-01-01"
+DEFAULT_PRICES = {
+    "Dry Cleaning": {"": 500, "Small": 500, "Medium": 500, "Large": 500},
+    "Duvet/Blanket Cleaning": {"Small": 200, "Medium": 350, "Large": 500},
+    "Clothes Cleaning": {"Small": 300, "Medium": 400, "Large": 600}
+}
+DEFAULT_IRONING_PRICE = 200
+
+def normalize_services(values):
+    """Map free-form service names to the canonical names (NaN when unknown)."""
+    text = pd.Series(values, dtype=object).fillna("").astype(str).str.strip().str.casefold()
+    return text.map(SERVICE_ALIASES)
+
+def normalize_sizes(values):
+    """Capitalize sizes and use '' for a missing size."""
+    return pd.Series(values, dtype=object).fillna("").astype(str).str.strip().str.capitalize()
+
+def requires_size(service):
+    return service in SIZED_SERVICES
+
+class PriceBook:
+    """Versioned price lists compiled into one lookup table.
+
+    The table has shape (versions, services, sizes, ironing) so whole columns
+    are priced with a single fancy-indexing operation; the version for each
+    row is found by binary search over the effective dates. The earliest
+    list also prices every date before it.
+    """
+
+    def __init__(self):
+        self.price_lists = []
+        self.effective_dates = np.array([], dtype='datetime64[ns]')
+        self.table = np.empty((0, len(SERVICES), len(SIZES), 2))
+
+    def add_price_list(self, effective_date, prices, ironing_price=DEFAULT_IRONING_PRICE):
+        effective_date = str(pd.Timestamp(effective_date).date())
+        # A new list with the same effective date replaces the old one
+        self.price_lists = [price_list for price_list in self.price_lists
+                            if price_list["effective_date"] != effective_date]
+        self.price_lists.append({
+            "effective_date": effective_date,
+            "prices": prices,
+            "ironing_price": ironing_price
+        })
+        self.price_lists.sort(key=lambda price_list: price_list["effective_date"])
+        self._compile()
+
+    def _compile(self):
+        table = np.full((len(self.price_lists), len(SERVICES), len(SIZES), 2), np.nan)
+        for v, price_list in enumerate(self.price_lists):
+            for service, size_prices in price_list["prices"].items():
+                for size, amount in size_prices.items():
+                    s, z = SERVICES.index(service), SIZES.index(size)
+                    table[v, s, z, 0] = amount
+                    table[v, s, z, 1] = amount + price_list["ironing_price"]
+        self.table = table
+        self.effective_dates = pd.to_datetime(
+            [price_list["effective_date"] for price_list in self.price_lists]).to_numpy(dtype='datetime64[ns]')
+
+    def price(self, services, sizes, ironing=False, dates=None):
+        """Price whole columns at once; invalid combinations come back as NaN."""
+        services = normalize_services(services)
+        sizes = normalize_sizes(sizes)
+        n = len(services)
+        service_codes = pd.Categorical(services, categories=SERVICES).codes
+        size_codes = pd.Categorical(sizes, categories=SIZES).codes
+        iron_codes = np.broadcast_to(np.asarray(ironing, dtype=bool), (n,)).astype(np.intp)
+        if not self.price_lists:
+            return np.full(n, np.nan)
+
+        if dates is None:
+            versions = np.full(n, len(self.price_lists) - 1)
+        else:
+            dates = pd.to_datetime(pd.Series(dates), errors='coerce').to_numpy(dtype='datetime64[ns]')
+            # Dates before the first list fall back to it rather than being unpriced
+            versions = np.maximum(np.searchsorted(self.effective_dates, dates, side='right') - 1, 0)
+            versions = np.where(np.isnat(dates), -1, versions)
+
+        valid = (service_codes >= 0) & (size_codes >= 0) & (versions >= 0)
+        amounts = self.table[np.where(valid, versions, 0), np.where(valid, service_codes, 0),
+                             np.where(valid, size_codes, 0), iron_codes]
+        return np.where(valid, amounts, np.nan)
+
+    def price_one(self, service, size="", ironing=False, date=None):
+        amount = self.price([service], [size], ironing, None if date is None else [date])[0]
+        return None if np.isnan(amount) else int(amount)
+
+    def reprice(self, df, ironing=False):
+        """Reprice historical activities against the list in effect on each date."""
+        sizes = df['Size'] if 'Size' in df.columns else pd.Series("", index=df.index)
+        return pd.Series(self.price(df['Service'], sizes, ironing, df['Date']), index=df.index)
+
+    def to_dict(self):
+        return {"price_lists": self.price_lists}
+
+def load_price_book(path=PRICE_LIST_FILE):
+    """Load the versioned price lists, falling back to the built-in list."""
+    book = PriceBook()
+    if os.path.isfile(path):
+        with open(path, 'r') as f:
+            for price_list in json.load(f)["price_lists"]:
+                book.add_price_list(price_list["effective_date"], price_list["prices"],
+                                    price_list.get("ironing_price", DEFAULT_IRONING_PRICE))
+    else:
+        book.add_price_list(DEFAULT_EFFECTIVE_DATE, DEFAULT_PRICES)
+    return book
+
+def save_price_book(book, path=PRICE_LIST_FILE):
+    with open(path, 'w') as f:
+        json.dump(book.to_dict(), f, indent=4)
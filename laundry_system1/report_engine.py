@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+AMOUNT = 'Total Amount'
+SUMMARY_STATISTICS = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+PERCENTILES = [0.25, 0.5, 0.75]
+
+# Every grouped total the report and the insights use, declared up front: name -> grouping columns
+GROUP_AGGREGATES = {
+    'by_location': ['Customer Location'],
+    'by_gender': ['Customer Gender'],
+    'by_activity': ['Service', 'Size'],
+}
+TOP_ACTIVITIES = 5
+SAMPLE_ROWS = 5
+
+def summarize(values, columns):
+    """describe()-style statistics for every column of a 2-D float array from one sort."""
+    ordered = np.sort(values, axis=0)  # NaN sorts last
+    counts = (~np.isnan(values)).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.nansum(values, axis=0) / counts
+        stds = np.sqrt(np.nansum((values - means) ** 2, axis=0) / (counts - 1))
+    stats = {'count': counts.astype(float), 'mean': means, 'std': stds}
+    for name, q in [('min', 0.0)] + [(f'{int(p * 100)}%', p) for p in PERCENTILES] + [('max', 1.0)]:
+        stats[name] = [quantile_sorted(ordered[:count, i], q) for i, count in enumerate(counts)]
+    return pd.DataFrame(stats, index=columns).T.loc[SUMMARY_STATISTICS]
+
+def quantile_sorted(ordered, q):
+    """Quantile of already sorted values with linear interpolation (the pandas default)."""
+    if len(ordered) == 0:
+        return np.nan
+    position = q * (len(ordered) - 1)
+    lower = int(np.floor(position))
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def compute_report(data):
+    """Every aggregate of the report and the insights in one pass over the data.
+
+    The numeric columns are sorted once for the summary statistics (which
+    also gives the count above the mean by binary search), and the grouped
+    totals are re-aggregated from a single groupby over all grouping
+    columns. Returns a plain dict that the text report and the insights
+    both read.
+    """
+    numeric = data.select_dtypes('number')
+    summary = summarize(numeric.to_numpy(dtype=np.float64), numeric.columns)
+    result = {'rows': len(data), 'summary': summary, 'groups': {}, 'amount_mean': None,
+              'high_spenders': None, 'sample': data.head(SAMPLE_ROWS)}
+
+    if AMOUNT in numeric.columns:
+        amounts = np.sort(data[AMOUNT].dropna().to_numpy(dtype=np.float64))
+        mean = summary.at['mean', AMOUNT]
+        result['amount_mean'] = mean
+        result['high_spenders'] = int(len(amounts) - np.searchsorted(amounts, mean, side='right'))
+
+        group_columns = list(dict.fromkeys(col for cols in GROUP_AGGREGATES.values() for col in cols
+                                           if col in data.columns))
+        if group_columns:
+            cells = data.groupby(group_columns, dropna=False, observed=True)[AMOUNT].sum()
+            for name, cols in GROUP_AGGREGATES.items():
+                if all(col in group_columns for col in cols):
+                    result['groups'][name] = cells.groupby(level=cols, dropna=False).sum()
+    return result
+
+def report_from_store(stats, cube, sample):
+    """The compute_report result from maintained aggregates, without reading the data.
+
+    stats is a running_stats.StatsStore and cube a rollup.RollupCube over
+    the same data; the count above the mean is estimated from the sketch.
+    """
+    amount = stats.columns.get(AMOUNT)
+    result = {'rows': stats.rows, 'summary': stats.summary(), 'groups': {}, 'amount_mean': None,
+              'high_spenders': None, 'sample': sample.head(SAMPLE_ROWS)}
+    if amount is not None and amount.count:
+        result['amount_mean'] = amount.mean
+        result['high_spenders'] = amount.count_above(amount.mean)
+        for name, cols in GROUP_AGGREGATES.items():
+            result['groups'][name] = cube.totals(cols)
+    return result
+
+def top_activities(result, n=TOP_ACTIVITIES):
+    activity = result['groups'].get('by_activity')
+    return None if activity is None else activity.sort_values(ascending=False).head(n)
@@ -0,0 +1,69 @@
+import html
+import json
+
+import pandas as pd
+
+from report_engine import TOP_ACTIVITIES, top_activities
+
+REPORT_FORMATS = {'text': '.txt', 'json': '.json', 'csv': '.csv', 'html': '.html'}
+RULE = "=" * 50
+
+def report_sections(result):
+    """(title, table, show index) for each section of a report result, in report order."""
+    yield "Summary Statistics", result['summary'], True
+    if 'by_location' in result['groups']:
+        yield "Total Amount by Location", result['groups']['by_location'], True
+    if 'by_gender' in result['groups']:
+        yield "Total Amount by Gender", result['groups']['by_gender'], True
+    activities = top_activities(result)
+    if activities is not None:
+        yield f"Top {TOP_ACTIVITIES} Activities by Amount", activities, True
+    customers = result.get('top_customers')
+    if customers is not None:
+        yield f"Top 5 Customers by Visits ({result['customers']} customers)", customers, False
+    yield "Sample Data", result['sample'], True
+
+def _records(table):
+    frame = table.to_frame() if isinstance(table, pd.Series) else table
+    if not isinstance(frame.index, pd.RangeIndex):
+        frame = frame.reset_index()
+    return frame
+
+def write_text(result, f, title):
+    f.write(f"{title}\n{RULE}\n")
+    for name, table, index in report_sections(result):
+        f.write(f"\n{name}:\n{RULE}\n")
+        f.write(table.to_string(index=index) + "\n")
+        f.write(f"{RULE}\n")
+
+def write_json(result, f, title):
+    f.write(f'{{"title": {json.dumps(title)}, "rows": {int(result["rows"])}, "sections": {{')
+    for i, (name, table, _) in enumerate(report_sections(result)):
+        f.write((", " if i else "") + json.dumps(name) + ": ")
+        f.write(_records(table).to_json(orient='records', date_format='iso'))
+    f.write("}}\n")
+
+def write_csv(result, f, title):
+    f.write(f"# {title}\n")
+    for name, table, _ in report_sections(result):
+        f.write(f"\n# {name}\n")
+        _records(table).to_csv(f, index=False, lineterminator="\n")
+
+def write_html(result, f, title):
+    f.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title></head>\n"
+            f"<body>\n<h1>{html.escape(title)}</h1>\n")
+    for name, table, index in report_sections(result):
+        f.write(f"<h2>{html.escape(name)}</h2>\n")
+        table.to_frame().to_html(f, index=index) if isinstance(table, pd.Series) else table.to_html(f, index=index)
+        f.write("\n")
+    f.write("</body></html>\n")
+
+WRITERS = {'text': write_text, 'json': write_json, 'csv': write_csv, 'html': write_html}
+
+def write_report(result, path, fmt='text', title="Customer Data Report"):
+    """Write a report result section by section, never holding the whole document in memory."""
+    if fmt not in WRITERS:
+        raise ValueError(f"Invalid report format. Choose from {', '.join(WRITERS)}.")
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        WRITERS[fmt](result, f, title)
+    return path
@@ -1,100 +1,155 @@
 import os
-import pandas as pd
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
-def read_csv_data():
-    """Read and process data from cleaned_customers_data.csv."""
-    csv_file = 'cleaned_customers_data.csv'
+import pandas as pd
 
-    if not os.path.exists(csv_file):
+from activity_store import read_table, table_exists
+from cleaning_data import CLEANED_DATA_FILE, iter_chunks
+from customers import CUSTOMER_INDEX_FILE, CustomerIndex
+from date_slicing import load_range
+from report_engine import SAMPLE_ROWS, compute_report, report_from_store
+from report_writers import REPORT_FORMATS, write_report
+from rollup import load_rollup
+from running_stats import load_stats
+
+REPORT_BASENAME = 'csv_report_summary'
+SEGMENT_REPORT_DIR = 'reports'
+# Segment name -> column the reports are split on
+SEGMENTS = {'location': 'Customer Location', 'service': 'Service', 'month': 'Date'}
+
+def read_csv_data(csv_file=CLEANED_DATA_FILE):
+    """Read and process the cleaned data (a CSV file, a columnar activity log or a database table)."""
+    if not table_exists(csv_file):
         print(f"The file '{csv_file}' does not exist.")
         return None
 
     try:
-        data = pd.read_csv(csv_file)
+        data = read_table(csv_file)
         return data
     except Exception as e:
         print(f"Failed to read CSV file {csv_file}: {e}")
         return None
 
-def generate_report():
-    data = read_csv_data()
+def generate_report(data_file=CLEANED_DATA_FILE, customer_file=CUSTOMER_INDEX_FILE, fmt='text', output=None,
+                    start_date=None, end_date=None, locations=None):
+    """Write the report as text, JSON, CSV or HTML (to csv_report_summary.<ext> by default).
 
-    if data is None or data.empty:
-        print("No data found in the CSV file.")
+    With a date range or locations the report covers only those activities.
+    """
+    if not table_exists(data_file):
+        print(f"The file '{data_file}' does not exist.")
         return
 
-    with open('csv_report_summary.txt', 'w') as f:
-        # Report Header
-        f.write("Customer Data Report\n")
-        f.write("=" * 50 + "\n")
-
-        # Summary Statistics Table
-        f.write("\nSummary Statistics:\n")
-        f.write("=" * 50 + "\n")
-        summary_stats = data.describe().to_string()
-        f.write(summary_stats + "\n")
-        f.write("=" * 50 + "\n")
-
-        # Grouped Data (e.g., by location or gender)
-        if 'location' in data.columns and 'amount' in data.columns:
-            location_summary = data.groupby('location')['amount'].sum().to_string()
-            f.write("\nTotal Amount by Location:\n")
-            f.write("=" * 50 + "\n")
-            f.write(location_summary + "\n")
-            f.write("=" * 50 + "\n")
-
-        if 'gender' in data.columns and 'amount' in data.columns:
-            gender_summary = data.groupby('gender')['amount'].sum().to_string()
-            f.write("\nTotal Amount by Gender:\n")
-            f.write("=" * 50 + "\n")
-            f.write(gender_summary + "\n")
-            f.write("=" * 50 + "\n")
-
-        # Top 5 Activities (based on amount)
-        if 'activity' in data.columns and 'amount' in data.columns:
-            top_activities = data.groupby('activity')['amount'].sum().sort_values(ascending=False).head(5).to_string()
-            f.write("\nTop 5 Activities by Amount:\n")
-            f.write("=" * 50 + "\n")
-            f.write(top_activities + "\n")
-            f.write("=" * 50 + "\n")
-
-        # Sample Data Table
-        f.write("\nSample Data:\n")
-        f.write("=" * 50 + "\n")
-        f.write(data.head().to_string())
-        f.write("\n" + "=" * 50 + "\n")
+    filtered = bool(start_date or end_date or locations)
+    if filtered:
+        # A binary-searched slice of the date-indexed data (an indexed query on a database), summarized in one pass
+        data = load_range(data_file, start_date, end_date, locations)
+        if data.empty:
+            print("No activities match the given dates and locations.")
+            return
+        result = compute_report(data.reset_index(drop=True))
+    else:
+        # Every section reads from the maintained statistics and rollup cube, which only fold in new rows
+        stats = load_stats(data_file)
+        if not stats.rows:
+            print("No data found in the CSV file.")
+            return
+        sample = next(iter(iter_chunks(data_file, SAMPLE_ROWS)))
+        result = report_from_store(stats, load_rollup(data_file), sample)
+
+    # Top customers straight from the customer index, no regrouping of the history
+    customer_index = CustomerIndex(customer_file)
+    if len(customer_index) and not filtered:
+        result['top_customers'] = customer_index.top_customers()
+        result['customers'] = len(customer_index)
+
+    output = output or REPORT_BASENAME + REPORT_FORMATS.get(fmt, '')
+    write_report(result, output, fmt)
 
     print("Report generated successfully!")
-    print(f"Report saved to 'csv_report_summary.txt'")
+    print(f"Report saved to '{output}'")
+    return result
+
+def segment_keys(data, segment):
+    """Report segment of each row: a location, a service or a month ('2024-09')."""
+    if segment not in SEGMENTS:
+        raise ValueError(f"Invalid segment. Choose from {', '.join(SEGMENTS)}.")
+    if segment == 'month':
+        return pd.to_datetime(data['Date'], errors='coerce').dt.strftime('%Y-%m')
+    return data[SEGMENTS[segment]]
+
+_segment_data = None
+
+def _init_segment_worker(data):
+    global _segment_data
+    _segment_data = data
+
+def _segment_report(positions, path, fmt, title):
+    write_report(compute_report(_segment_data.iloc[positions]), path, fmt, title)
+    return path
+
+def generate_segment_reports(data_file=CLEANED_DATA_FILE, segment='location', fmt='text',
+                             output_dir=SEGMENT_REPORT_DIR, workers=None):
+    """One report per location, service or month, written in parallel from one loaded dataset.
+
+    The data is read once and handed to each worker process when it
+    starts (with fork it is shared, not copied); tasks only carry the row
+    positions of their segment. Returns the written paths.
+    """
+    data = read_csv_data(data_file)
+    if data is None or data.empty:
+        print("No data found in the CSV file.")
+        return []
+    keys = segment_keys(data, segment)
+    positions = data.groupby(keys.to_numpy(), dropna=True).indices
+    os.makedirs(output_dir, exist_ok=True)
+
+    paths = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_segment_worker, initargs=(data,)) as pool:
+        futures = []
+        for key, rows in positions.items():
+            name = re.sub(r'[^\w-]+', '_', str(key)).strip('_') or 'blank'
+            path = os.path.join(output_dir, f"{segment}_{name}{REPORT_FORMATS[fmt]}")
+            title = f"Customer Data Report: {SEGMENTS[segment] if segment != 'month' else 'Month'} {key}"
+            futures.append(pool.submit(_segment_report, rows, path, fmt, title))
+        for future in futures:
+            paths.append(future.result())
+    print(f"{len(paths)} {segment} reports saved to '{output_dir}'")
+    return paths
 
 def generate_ai_insights(data):
-    """Generate AI-driven insights from the data."""
+    """Generate AI-driven insights from the data or from an already computed report result."""
+    result = data if isinstance(data, dict) else compute_report(data)
     insights = []
 
     # Example Insight: Check for high spenders
-    if 'amount' in data.columns:
-        high_spenders = data[data['amount'] > data['amount'].mean()]
-        if not high_spenders.empty:
-            insights.append(f"There are {len(high_spenders)} transactions with amounts higher than the average ({data['amount'].mean():.2f}).")
+    if result['high_spenders']:
+        insights.append(f"There are {result['high_spenders']} transactions with amounts higher than the average ({result['amount_mean']:.2f}).")
 
     # Example Insight: Gender-based spending
-    if 'gender' in data.columns and 'amount' in data.columns:
-        gender_spending = data.groupby('gender')['amount'].sum()
-        insights.append(f"Gender-based spending: {gender_spending.to_dict()}")
+    if 'by_gender' in result['groups']:
+        insights.append(f"Gender-based spending: {result['groups']['by_gender'].to_dict()}")
 
     # Example Insight: Location-based spending
-    if 'location' in data.columns and 'amount' in data.columns:
-        location_spending = data.groupby('location')['amount'].sum()
-        insights.append(f"Location-based spending: {location_spending.to_dict()}")
+    if 'by_location' in result['groups']:
+        insights.append(f"Location-based spending: {result['groups']['by_location'].to_dict()}")
 
     return insights
 
 if __name__ == "__main__":
-    data = read_csv_data()
-    if data is not None:
-        generate_report()
-        ai_insights = generate_ai_insights(data)
-        print("\nAI-Driven Insights:")
-        print("=" * 50)
-        for insight in ai_insights:
-            print(insight)
+    # python reporting.py [text|json|csv|html] [--segments location|service|month]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--') and arg not in SEGMENTS]
+    fmt = args[0] if args else 'text'
+    if '--segments' in sys.argv:
+        segment = next((arg for arg in sys.argv[1:] if arg in SEGMENTS), 'location')
+        generate_segment_reports(segment=segment, fmt=fmt)
+    else:
+        result = generate_report(fmt=fmt)
+        if result is not None:
+            ai_insights = generate_ai_insights(result)
+            print("\nAI-Driven Insights:")
+            print("=" * 50)
+            for insight in ai_insights:
+                print(insight)
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import sys
+
+import pandas as pd
+
+from activity_store import table_exists
+from cleaning_data import CLEANED_DATA_FILE, count_rows, iter_chunks, output_version, read_new_rows
+from date_slicing import date_bounds
+from periods import aggregate_by_period
+
+ROLLUP_FILE = 'rollup_cube.pkl'
+DIMENSIONS = ['Date', 'Service', 'Size', 'Customer Gender', 'Customer Location']
+AMOUNT = 'Total Amount'
+COUNT = 'Count'
+# Rows hashed from the top of a source cleaning did not write, to notice that it was rewritten rather than appended to
+PREFIX_ROWS = 1000
+
+class RollupCube:
+    """Sums and counts of the total amount by day x service x size x gender x location.
+
+    Charts and reports query this instead of regrouping every transaction:
+    the cube has one row per distinct combination per day, and weekly,
+    monthly or yearly views are re-aggregations of the daily cells. New
+    activities are folded in with update_from_frame().
+    """
+
+    # Source columns the cube is built from; a rewrite of any of them invalidates it
+    SOURCE_COLUMNS = DIMENSIONS + [AMOUNT]
+
+    def __init__(self, frame=None, rows=0, source=None, source_version=None):
+        if frame is None:
+            index = pd.MultiIndex.from_arrays([[]] * len(DIMENSIONS), names=DIMENSIONS)
+            frame = pd.DataFrame({AMOUNT: pd.Series(dtype=float), COUNT: pd.Series(dtype='int64')}, index=index)
+        self.frame = frame
+        self.rows = rows
+        self.source = source
+        self.source_version = source_version
+
+    @classmethod
+    def from_frame(cls, df):
+        cube = cls()
+        cube.update_from_frame(df)
+        return cube
+
+    def __len__(self):
+        return len(self.frame)
+
+    @staticmethod
+    def _aggregate(df):
+        keys = pd.DataFrame({
+            col: df[col].astype(object) if col in df.columns else None for col in DIMENSIONS[1:]
+        }, index=df.index)
+        keys.insert(0, 'Date', pd.to_datetime(df['Date'], errors='coerce').dt.normalize())
+        keys[AMOUNT] = pd.to_numeric(df[AMOUNT], errors='coerce')
+        return keys.groupby(DIMENSIONS, dropna=False, sort=False).agg(
+            **{AMOUNT: (AMOUNT, 'sum'), COUNT: (AMOUNT, 'size')})
+
+    def update_from_frame(self, df):
+        """Fold a batch of activities into the cube."""
+        if df.empty:
+            return
+        part = self._aggregate(df)
+        frame = part if self.frame.empty else pd.concat([self.frame, part])
+        self.frame = frame.groupby(level=DIMENSIONS, dropna=False).sum()
+        self.rows += len(df)
+
+    def slice(self, start_date=None, end_date=None, locations=None):
+        """A cube restricted to an inclusive date range and, optionally, to some locations.
+
+        The cells are sorted by date first, so the range is a binary search
+        and a positional slice of the frame.
+        """
+        frame = self.frame
+        if start_date or end_date:
+            start, stop = date_bounds(frame.index.get_level_values('Date'), start_date, end_date)
+            frame = frame.iloc[start:stop]
+        if locations:
+            locations = [locations] if isinstance(locations, str) else locations
+            frame = frame[frame.index.get_level_values('Customer Location').isin(locations)]
+        return RollupCube(frame, self.rows, self.source, self.source_version)
+
+    def totals(self, by, measure=AMOUNT):
+        """Re-aggregate the cells over the given dimensions (AMOUNT sums or COUNT)."""
+        return self.frame.groupby(level=list(by), dropna=False)[measure].sum()
+
+    def period_totals(self, period='daily', by=None, measure=AMOUNT, rolling=None):
+        """Time-indexed totals per period (see periods.aggregate_by_period), one column per group with by."""
+        cells = self.frame[measure].reset_index()
+        frame = aggregate_by_period(cells, period, value=measure, by=by, rolling=rolling)
+        return frame[measure] if by is None and rolling is None else frame
+
+    def segments(self):
+        """One row per populated cell, with the dimension columns (forecast segments and dates)."""
+        return self.frame.reset_index()
+
+    def save(self, path=ROLLUP_FILE):
+        tmp_path = path + '.tmp'
+        pd.to_pickle({'frame': self.frame, 'rows': self.rows, 'source': self.source,
+                      'source_version': self.source_version}, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=ROLLUP_FILE):
+        if not os.path.isfile(path):
+            return None
+        state = pd.read_pickle(path)
+        return cls(state['frame'], state['rows'], state['source'], state.get('source_version'))
+
+def prefix_hash(data_file, rows, columns=None):
+    """Hash of the first rows of the source (of the given columns, or all), which an append leaves unchanged."""
+    if rows == 0:
+        return None
+    first = next(iter(iter_chunks(data_file, rows)), None)
+    if first is None:
+        return None
+    if columns is not None:
+        first = first[[col for col in columns if col in first.columns]]
+    first = first.astype(str)
+    return hashlib.sha256(pd.util.hash_pandas_object(first, index=False).values.tobytes()).hexdigest()
+
+def source_version(data_file, rows, columns=None):
+    """What the first rows of a source hold: the cleaning run that wrote it (and rewrote the given
+    columns since) or, for a source cleaning did not write, a hash of its first rows."""
+    return output_version(data_file, columns) or prefix_hash(data_file, min(rows, PREFIX_ROWS), columns)
+
+def load_incremental(store_class, data_file, path):
+    """A maintained store (RollupCube, StatsStore) for a data file, folding in only rows appended since it was saved.
+
+    The store is rebuilt when the source shrank, was rewritten (a new full
+    clean, or a rewrite of earlier rows in the columns it is built from) or
+    when it belongs to another file.
+    """
+    if not table_exists(data_file):
+        raise FileNotFoundError(f"Data file '{data_file}' not found.")
+    columns = store_class.SOURCE_COLUMNS
+    rows = count_rows(data_file)
+    store = store_class.load(path)
+    if (store is None or store.source != data_file or store.rows > rows
+            or store.source_version != source_version(data_file, store.rows, columns)):
+        store = store_class(source=data_file)
+    if store.rows == rows:
+        return store
+
+    for chunk in iter_chunks(data_file, 50000) if store.rows == 0 else [read_new_rows(data_file, store.rows)]:
+        store.update_from_frame(chunk)
+    store.source_version = source_version(data_file, store.rows, columns)
+    store.save(path)
+    return store
+
+def load_rollup(data_file=CLEANED_DATA_FILE, path=ROLLUP_FILE):
+    """The cube for a data file, folding in only rows appended since it was last saved."""
+    return load_incremental(RollupCube, data_file, path)
+
+if __name__ == "__main__":
+    data_file = sys.argv[1] if len(sys.argv) > 1 else CLEANED_DATA_FILE
+    cube = load_rollup(data_file)
+    print(f"{cube.rows} activities rolled up into {len(cube)} cells.")
+    print(cube.period_totals('monthly').to_string())
@@ -0,0 +1,217 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from cleaning_data import CLEANED_DATA_FILE
+from report_engine import PERCENTILES, SUMMARY_STATISTICS
+from rollup import load_incremental
+
+STATS_FILE = 'report_stats.pkl'
+# Sketch accuracy: the rank error is roughly 1.7 / SKETCH_K of the row count
+SKETCH_K = 200
+
+class KLLSketch:
+    """Mergeable quantile sketch (Karnin, Lang and Liberty).
+
+    Values sit in levels; an item on level h stands for 2**h values. When
+    a level outgrows its capacity it is sorted and every other item (from
+    a random offset) is promoted to the level above. Two sketches merge
+    by concatenating their levels and compacting again, so sketches built
+    per day or per branch combine into one. Until the first compaction
+    the sketch holds every value and quantiles are exact.
+    """
+
+    def __init__(self, k=SKETCH_K, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.n
+
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.n += len(values)
+            self._compress()
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays on this level
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[:len(items) - len(keep)]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], pairs[self.rng.integers(2)::2]])
+                self.levels[level] = keep
+                # Capacities shrink with depth, so recheck from the bottom
+                level = 0
+                continue
+            level += 1
+
+    def _weighted(self):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], weights[order]
+
+    def rank(self, value):
+        """Estimated number of values <= value."""
+        return int(sum((items <= value).sum() * 2 ** level for level, items in enumerate(self.levels)))
+
+    def quantile(self, q):
+        if self.n == 0:
+            return np.nan
+        if len(self.levels) == 1:
+            return float(np.quantile(self.levels[0], q))
+        values, weights = self._weighted()
+        position = np.searchsorted(np.cumsum(weights), q * weights.sum(), side='left')
+        return float(values[min(position, len(values) - 1)])
+
+class RunningStats:
+    """Count, sum, Welford mean and variance, min, max and a quantile sketch for one column.
+
+    Batches and other RunningStats fold in with the parallel form of
+    Welford's update (Chan et al.), so partial statistics merge exactly.
+    """
+
+    def __init__(self, k=SKETCH_K):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sketch = KLLSketch(k)
+
+    def _combine(self, count, mean, m2, minimum, maximum):
+        if count == 0:
+            return
+        new_count = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / new_count
+        self.m2 += m2 + delta ** 2 * self.count * count / new_count
+        self.count = new_count
+        self.total += mean * count
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            mean = values.mean()
+            self._combine(len(values), mean, ((values - mean) ** 2).sum(), values.min(), values.max())
+            self.sketch.update(values)
+
+    def merge(self, other):
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    def count_above(self, value):
+        """Estimated number of values greater than value."""
+        return self.count - self.sketch.rank(value)
+
+    def describe(self):
+        if self.count == 0:
+            return pd.Series([0.0] + [np.nan] * (len(SUMMARY_STATISTICS) - 1), index=SUMMARY_STATISTICS)
+        return pd.Series([float(self.count), self.mean, np.sqrt(self.variance), self.min]
+                         + [self.sketch.quantile(q) for q in PERCENTILES] + [self.max], index=SUMMARY_STATISTICS)
+
+class StatsStore:
+    """Running statistics of every numeric column of the activity data.
+
+    Updated with each batch of new activities, so the report's summary
+    statistics never need the whole history: summary() costs the same
+    however many activities were recorded. Stores built on separate
+    days or branches merge with merge().
+    """
+
+    # Every column counts: the numeric columns summarized depend on the data
+    SOURCE_COLUMNS = None
+
+    def __init__(self, columns=None, rows=0, source=None, source_version=None):
+        self.columns = columns if columns is not None else {}
+        self.rows = rows
+        self.source = source
+        self.source_version = source_version
+
+    @classmethod
+    def from_frame(cls, df):
+        store = cls()
+        store.update_from_frame(df)
+        return store
+
+    def __len__(self):
+        return self.rows
+
+    def update_from_frame(self, df):
+        """Fold a batch of activities into the statistics."""
+        for col in df.select_dtypes('number').columns:
+            self.columns.setdefault(col, RunningStats()).update(df[col].to_numpy())
+        self.rows += len(df)
+
+    def merge(self, other):
+        for col, stats in other.columns.items():
+            self.columns.setdefault(col, RunningStats()).merge(stats)
+        self.rows += other.rows
+        return self
+
+    def summary(self):
+        """describe()-style table of the numeric columns; percentiles come from the sketches."""
+        return pd.DataFrame({col: stats.describe() for col, stats in self.columns.items()},
+                            index=SUMMARY_STATISTICS)
+
+    def save(self, path=STATS_FILE):
+        tmp_path = path + '.tmp'
+        pd.to_pickle({'columns': self.columns, 'rows': self.rows, 'source': self.source,
+                      'source_version': self.source_version}, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=STATS_FILE):
+        if not os.path.isfile(path):
+            return None
+        state = pd.read_pickle(path)
+        return cls(state['columns'], state['rows'], state['source'], state.get('source_version'))
+
+def load_stats(data_file=CLEANED_DATA_FILE, path=STATS_FILE):
+    """The statistics for a data file, folding in only rows appended since they were last saved.
+
+    Like the rollup cube they are rebuilt when the source shrank, was
+    rewritten (in any column) or belongs to another file.
+    """
+    return load_incremental(StatsStore, data_file, path)
+
+if __name__ == "__main__":
+    data_file = sys.argv[1] if len(sys.argv) > 1 else CLEANED_DATA_FILE
+    store = load_stats(data_file)
+    print(f"Statistics over {store.rows} activities:")
+    print(store.summary().to_string())
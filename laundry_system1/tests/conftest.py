@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules live flat in laundry_system1 and are imported by name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,97 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from activity_store import MANIFEST_FILE, ActivityLog
+
+def activities(n, start=0):
+    return pd.DataFrame({
+        'Date': pd.date_range('2024-08-01', periods=n).shift(start, freq='D').strftime('%Y-%m-%d'),
+        'Customer Name': [f'Customer {i % 3}' for i in range(start, start + n)],
+        'Service': ['Washing', 'Ironing'] * (n // 2) + ['Washing'] * (n % 2),
+        'Total Amount': np.arange(start, start + n, dtype=np.int64) * 100,
+    })
+
+@pytest.fixture
+def log(tmp_path):
+    return ActivityLog(str(tmp_path / 'activities.alog'))
+
+def test_append_round_trips(log):
+    log.append(activities(3))
+    log.append(activities(2, start=3))
+
+    data = log.read()
+    assert len(log) == 5
+    assert list(data.columns) == ['Date', 'Customer Name', 'Service', 'Total Amount']
+    assert data['Total Amount'].tolist() == [0, 100, 200, 300, 400]
+    assert data['Customer Name'].astype(str).tolist() == ['Customer 0', 'Customer 1', 'Customer 2',
+                                                          'Customer 0', 'Customer 1']
+    assert data['Date'].iloc[4] == pd.Timestamp('2024-08-05')
+
+def test_iter_chunks_matches_read(log):
+    log.append(activities(4))
+    log.append(activities(3, start=4))
+    chunks = list(log.iter_chunks(2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 2, 1]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), log.read(mmap=False))
+
+def test_append_after_compact(log):
+    log.append(activities(2))
+    log.append(activities(2, start=2))
+    log.compact()
+    assert len(log.manifest['segments']) == 1
+    log.append(activities(2, start=4))
+    log.append(activities(2, start=6))
+
+    names = [segment['name'] for segment in log.manifest['segments']]
+    assert len(set(names)) == len(names) == 3
+    assert ActivityLog(log.path).read()['Total Amount'].tolist() == list(range(0, 800, 100))
+
+def test_manifest_without_counter_continues_after_last_segment(log):
+    log.append(activities(2))
+    log.append(activities(2, start=2))
+    log.compact()
+    manifest_path = os.path.join(log.path, MANIFEST_FILE)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    del manifest['next_segment']
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+
+    reopened = ActivityLog(log.path)
+    reopened.append(activities(1, start=4))
+    assert len(reopened) == 5
+
+def test_new_column_is_missing_in_earlier_rows(log):
+    log.append(activities(2))
+    log.append(activities(2, start=2).assign(Size=['Large', 'Small']))
+
+    data = log.read()
+    assert data['Size'].isna().tolist() == [True, True, False, False]
+    assert data['Size'].astype(str).tolist()[2:] == ['Large', 'Small']
+
+def test_fractions_widen_an_int_column(log):
+    log.append(activities(2))
+    log.append(activities(1, start=2).assign(**{'Total Amount': [250.5]}))
+
+    assert log.manifest['kinds']['Total Amount'] == 'float'
+    assert log.read()['Total Amount'].tolist() == [0.0, 100.0, 250.5]
+
+def test_non_numeric_values_are_rejected_without_changes(log):
+    log.append(activities(2))
+    bad = activities(1, start=2).assign(**{'Total Amount': ['a lot']}, Size=['Large'])
+
+    with pytest.raises(ValueError, match="Total Amount"):
+        log.append(bad)
+    reopened = ActivityLog(log.path)
+    assert len(reopened) == 2
+    assert 'Size' not in reopened.columns
+    assert reopened.manifest['kinds']['Total Amount'] == 'int'
+
+def test_missing_columns_are_rejected(log):
+    log.append(activities(2))
+    with pytest.raises(ValueError, match="Columns are missing"):
+        log.append(activities(1).drop(columns=['Service']))
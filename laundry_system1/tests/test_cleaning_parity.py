@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from activity_store import read_table
+from cleaning_data import clean_data, clean_data_incremental, clean_data_streaming
+
+SOURCE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'extended_weekly_customers.csv')
+
+def with_gaps(df, seed=0):
+    """Blank a share of the cells (forward fill, gender lookup and price fill all have work to do)."""
+    df = df.copy()
+    rng = np.random.default_rng(seed)
+    for col in ['Customer Location', 'Customer Gender', 'Service', 'Size', 'Total Amount']:
+        df.loc[rng.random(len(df)) < 0.1, col] = np.nan
+    # Gaps on what become chunk boundaries for the small chunk sizes
+    df.loc[[7, 14, 21], ['Customer Gender', 'Total Amount']] = np.nan
+    return df
+
+@pytest.fixture(params=['clean', 'gaps'])
+def input_file(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.read_csv(SOURCE_FILE)
+    if request.param == 'gaps':
+        df = with_gaps(df)
+    df.to_csv('input.csv', index=False)
+    return 'input.csv'
+
+@pytest.mark.parametrize('chunksize', [1, 7, 50000])
+def test_streaming_matches_full_clean(input_file, chunksize):
+    clean_data(input_file, 'full.csv', customer_file='full_customers.json', state_file='full_state.json')
+    clean_data_streaming(input_file, 'streamed.csv', chunksize=chunksize,
+                         customer_file='streamed_customers.json', state_file='streamed_state.json')
+
+    with open('full.csv', 'rb') as full, open('streamed.csv', 'rb') as streamed:
+        assert streamed.read() == full.read()
+
+@pytest.mark.parametrize('output_file', ['incremental.csv', 'incremental.alog', 'incremental.db#cleaned'])
+def test_incremental_patches_customer_columns(input_file, output_file):
+    clean_data(input_file, 'full.csv', customer_file='full_customers.json', state_file='full_state.json')
+    df = pd.read_csv(input_file)
+    df.iloc[:120].to_csv('raw.csv', index=False)
+    clean_data_incremental('raw.csv', output_file, 'state.json', 'customers.json')
+    df.iloc[120:].to_csv('raw.csv', mode='a', header=False, index=False)
+    clean_data_incremental('raw.csv', output_file, 'state.json', 'customers.json')
+
+    full = pd.read_csv('full.csv')
+    incremental = read_table(output_file)
+    assert incremental['Number of Times Served'].astype(float).tolist() == full['Number of Times Served'].astype(float).tolist()
+    assert incremental['Customer Gender'].astype(str).tolist() == full['Customer Gender'].astype(str).tolist()
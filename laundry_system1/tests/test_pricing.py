@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pricing import DEFAULT_PRICES, PriceBook
+
+@pytest.fixture
+def book():
+    book = PriceBook()
+    book.add_price_list('2024-01-01', DEFAULT_PRICES)
+    raised = {service: {size: amount + 100 for size, amount in sizes.items()} for service, sizes in DEFAULT_PRICES.items()}
+    book.add_price_list('2024-06-01', raised, ironing_price=250)
+    return book
+
+def test_each_date_uses_the_list_in_effect(book):
+    dates = ['2024-03-15', '2024-05-31', '2024-06-01', '2025-01-01']
+    prices = book.price(['Clothes Cleaning'] * 4, ['Large'] * 4, dates=dates)
+    assert prices.tolist() == [600, 600, 700, 700]
+
+def test_dates_before_the_first_list_use_the_earliest_list(book):
+    assert book.price_one('Duvet/Blanket Cleaning', 'Small', date='2023-12-31') == 200
+    assert book.price_one('Dry Cleaning', date='2020-01-01') == 500
+
+def test_without_a_date_the_latest_list_applies(book):
+    assert book.price_one('Clothes Cleaning', 'Medium') == 500
+
+def test_ironing_adds_the_ironing_price_of_that_list(book):
+    prices = book.price(['Clothes Cleaning'] * 2, ['Small'] * 2, ironing=[True, True], dates=['2024-02-01', '2024-07-01'])
+    assert prices.tolist() == [300 + 200, 400 + 250]
+
+def test_service_aliases_and_size_case_are_normalized(book):
+    assert book.price_one(' duvet ', 'large', date='2024-02-01') == 500
+
+def test_invalid_rows_are_nan(book):
+    prices = book.price(['Ironing only', 'Clothes Cleaning', 'Clothes Cleaning'], ['Small', 'Huge', 'Small'],
+                        dates=['2024-02-01', '2024-02-01', 'not a date'])
+    assert np.isnan(prices).all()
+
+def test_a_list_with_the_same_date_replaces_the_old_one(book):
+    book.add_price_list('2024-06-01', DEFAULT_PRICES)
+    assert len(book.price_lists) == 2
+    assert book.price_one('Clothes Cleaning', 'Large', date='2024-07-01') == 600
+
+def test_reprice_uses_each_activity_date(book):
+    df = pd.DataFrame({'Date': ['2023-05-01', '2024-08-01'], 'Service': ['Dry Cleaning', 'Dry Cleaning']})
+    assert book.reprice(df).tolist() == [500, 600]
+
+def test_an_empty_book_prices_nothing():
+    assert np.isnan(PriceBook().price(['Dry Cleaning'], [''], dates=['2024-02-01'])).all()
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from collecting_data import validate_batch
+from pricing import PriceBook, save_price_book
+
+VALID = {'Date': '2024-08-20', 'Customer Name': 'Jane Smith', 'Customer Location': 'Nairobi',
+         'Customer Gender': 'Female', 'Service': 'Clothes Cleaning', 'Size': 'Large', 'Ironing': 'no'}
+
+@pytest.fixture(autouse=True)
+def default_prices(tmp_path, monkeypatch):
+    # No price_lists.json here, so the built-in list prices the batch
+    monkeypatch.chdir(tmp_path)
+
+def reason_for(**changes):
+    accepted, rejects = validate_batch(pd.DataFrame([{**VALID, **changes}]))
+    assert accepted.empty
+    return rejects['Reason'].iloc[0]
+
+def test_valid_rows_are_normalized_and_priced():
+    batch = pd.DataFrame([VALID, {**VALID, 'Service': ' dry ', 'Size': '', 'Customer Gender': 'male', 'Ironing': 'Yes'}])
+    accepted, rejects = validate_batch(batch)
+
+    assert rejects.empty
+    assert accepted['Service'].tolist() == ['Clothes Cleaning', 'Dry Cleaning']
+    assert accepted['Customer Gender'].tolist() == ['Female', 'Male']
+    assert accepted['Total Amount'].tolist() == [600, 700]
+    assert list(accepted.columns) == ['Date', 'Customer Name', 'Customer Location', 'Customer Gender',
+                                      'Service', 'Size', 'Total Amount']
+
+@pytest.mark.parametrize('changes, reason', [
+    ({'Date': '20/08/2024'}, "Invalid date format. Please use YYYY-MM-DD."),
+    ({'Customer Name': '  '}, "Missing customer name."),
+    ({'Customer Gender': 'Other'}, "Invalid gender. Please enter 'Male' or 'Female'."),
+    ({'Service': 'Ironing only'}, "Invalid service type."),
+    ({'Size': 'Huge'}, "Invalid size. Please enter 'Small', 'Medium', or 'Large'."),
+    ({'Ironing': 'maybe'}, "Invalid ironing value. Please enter 'yes' or 'no'."),
+])
+def test_each_reject_reason(changes, reason):
+    assert reason_for(**changes) == reason
+
+def test_unpriced_combinations_are_rejected():
+    book = PriceBook()
+    book.add_price_list('2024-01-01', {'Dry Cleaning': {'': 500}})
+    save_price_book(book)
+    assert reason_for() == "No price list is in effect for this date, service and size."
+
+def test_the_first_failing_check_wins():
+    assert reason_for(Date='yesterday', **{'Customer Name': ''}, Service='Ironing only') == \
+        "Invalid date format. Please use YYYY-MM-DD."
+    assert reason_for(**{'Customer Gender': 'x'}, Size='Huge', Ironing='maybe') == \
+        "Invalid gender. Please enter 'Male' or 'Female'."
+    assert reason_for(Size='Huge', Ironing='maybe') == "Invalid size. Please enter 'Small', 'Medium', or 'Large'."
+
+def test_rejects_keep_their_original_row_and_values():
+    batch = pd.DataFrame([VALID, {**VALID, 'Service': 'Ironing only'}, VALID])
+    accepted, rejects = validate_batch(batch)
+    assert accepted.index.tolist() == [0, 2]
+    assert rejects.index.tolist() == [1]
+    assert rejects.loc[1, 'Service'] == 'Ironing only'
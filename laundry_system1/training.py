@@ -1,20 +1,53 @@
 import pandas as pd
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, GridSearchCV, RandomizedSearchCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingGridSearchCV)
+from sklearn.model_selection import HalvingGridSearchCV
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_squared_error, r2_score
-import joblib
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 import os
+import sys
+import json
+import hashlib
+import tempfile
+import time
+from datetime import datetime, timedelta
+from activity_store import read_table, table_exists, write_table
+from cleaning_data import CLEANED_DATA_FILE
+from model_registry import REGISTRY_DIR, ModelRegistry
 
-def train_model(data_path='cleaned_customers_data.csv'):
-    # Load and preprocess data
-    if not os.path.isfile(data_path):
-        print(f"Data file '{data_path}' not found.")
-        return
+SEARCH_CACHE_FILE = 'search_cache.json'
+SEARCH_CACHE_SIZE = 20
+# Above this many rows the fingerprint hashes an evenly spaced sample instead of every row
+FINGERPRINT_SAMPLE_ROWS = 100000
+CATEGORICAL_FEATURES = ['Service', 'Size', 'Customer Gender', 'Customer Location']
+NUMERIC_FEATURES = ['Day', 'Month', 'Year']
+TARGET = 'Total Amount'
+
+# Incremental updates: trees added per update and the cap before a full refit
+TREES_PER_UPDATE = 20
+MAX_TREES = 500
+# Define parameter grid for hyperparameter tuning
+PARAM_GRID = {
+    'regressor__n_estimators': [100, 200],
+    'regressor__max_depth': [None, 10, 20],
+    'regressor__min_samples_split': [2, 5],
+    'regressor__min_samples_leaf': [1, 4]
+}
 
-    df = pd.read_csv(data_path)
+# Full search when the error on new rows exceeds this multiple of the validation error...
+DRIFT_THRESHOLD = 1.25
+# ...measured over at least this many rows, accumulated across updates since the last search...
+DRIFT_MIN_ROWS = 200
+# ...or when the last full search is older than this
+FULL_SEARCH_INTERVAL_DAYS = 7
+
+def load_training_data(data_path):
+    """Load the cleaned data and return the feature frame and target."""
+    df = read_table(data_path)
 
     # Check for and handle missing values
     if df.isnull().sum().any():
@@ -33,81 +66,262 @@ def train_model(data_path='cleaned_customers_data.csv'):
     df['Customer Location'] = df['Customer Location'].astype('category')
 
     # Define features and target
-    X = df[['Day', 'Month', 'Year', 'Service', 'Size', 'Customer Gender', 'Customer Location']]
-    y = df['Total Amount']
+    X = df[NUMERIC_FEATURES + CATEGORICAL_FEATURES]
+    y = df[TARGET]
+    return X, y
 
-    # Preprocessing and model pipeline
+def build_pipeline(params=None, memory=None):
+    """Preprocessing and model pipeline, optionally with chosen hyperparameters."""
     preprocessor = ColumnTransformer(
         transformers=[
-            ('cat', OneHotEncoder(handle_unknown='ignore', sparse_output=False),
-             ['Service', 'Size', 'Customer Gender', 'Customer Location']),
-            ('num', StandardScaler(), ['Day', 'Month', 'Year'])
+            ('cat', OneHotEncoder(handle_unknown='ignore', sparse_output=False), CATEGORICAL_FEATURES),
+            ('num', StandardScaler(), NUMERIC_FEATURES)
         ])
 
     pipeline = Pipeline(steps=[
         ('preprocessor', preprocessor),
         ('regressor', RandomForestRegressor(random_state=42))
-    ])
-
-    # Define parameter grid for hyperparameter tuning
-    param_grid = {
-        'regressor__n_estimators': [100, 200],
-        'regressor__max_depth': [None, 10, 20],
-        'regressor__min_samples_split': [2, 5],
-        'regressor__min_samples_leaf': [1, 4]
-    }
+    ], memory=memory)
+    if params:
+        pipeline.set_params(**params)
+    return pipeline
+
+def data_fingerprint(X, y):
+    """Hash the schema, row count and contents (or a sample) of the training frame."""
+    frame = X.assign(**{TARGET: y})
+    if len(frame) > FINGERPRINT_SAMPLE_ROWS:
+        frame = frame.iloc[::len(frame) // FINGERPRINT_SAMPLE_ROWS]
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[col, str(dtype)] for col, dtype in X.dtypes.items()]).encode())
+    digest.update(str(len(X)).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=False).values.tobytes())
+    return digest.hexdigest()
+
+def load_search_cache(cache_file=SEARCH_CACHE_FILE):
+    if os.path.isfile(cache_file):
+        with open(cache_file, 'r') as f:
+            return json.load(f)
+    return {}
+
+def save_search_result(key, result, cache_file=SEARCH_CACHE_FILE):
+    cache = load_search_cache(cache_file)
+    cache.pop(key, None)
+    cache[key] = result
+    # Keep only the most recent results
+    cache = dict(list(cache.items())[-SEARCH_CACHE_SIZE:])
+    tmp_file = cache_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(cache, f, indent=4)
+    os.replace(tmp_file, cache_file)
+
+def make_search(pipeline, search='grid', n_iter=10):
+    """Hyperparameter search over PARAM_GRID: exhaustive, successive halving or randomized."""
+    if search == 'halving':
+        return HalvingGridSearchCV(pipeline, PARAM_GRID, cv=5, factor=3, random_state=42,
+                                   scoring='neg_mean_squared_error', n_jobs=-1)
+    if search == 'random':
+        return RandomizedSearchCV(pipeline, PARAM_GRID, n_iter=n_iter, cv=5, random_state=42,
+                                  scoring='neg_mean_squared_error', n_jobs=-1)
+    if search == 'grid':
+        return GridSearchCV(pipeline, PARAM_GRID, cv=5,
+                            scoring='neg_mean_squared_error', n_jobs=-1)
+    raise ValueError("Invalid search strategy. Choose from 'grid', 'halving' or 'random'.")
+
+def best_fold_scores(search_cv):
+    """Per-fold test scores of the selected candidate, taken from cv_results_."""
+    return [float(search_cv.cv_results_[f'split{i}_test_score'][search_cv.best_index_])
+            for i in range(search_cv.n_splits_)]
+
+def train_model(data_path=CLEANED_DATA_FILE, registry_dir=REGISTRY_DIR,
+                search='grid', n_iter=10, use_cache=True):
+    """Search hyperparameters, publish the model fitted on all rows and report its metrics.
+
+    Cross-validation metrics come from the search itself and one holdout
+    fit on a clone gives the test metrics, so the published model is never
+    refitted. Returns the metrics with a per-phase timing breakdown.
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    # Load and preprocess data
+    if not table_exists(data_path):
+        print(f"Data file '{data_path}' not found.")
+        return
 
-    # Implement GridSearchCV for hyperparameter tuning
-    grid_search = GridSearchCV(pipeline, param_grid, cv=5,
-                               scoring='neg_mean_squared_error', n_jobs=-1)
-    grid_search.fit(X, y)
+    X, y = load_training_data(data_path)
+    timings['load'] = time.perf_counter() - started
 
-    # Best model from GridSearchCV
-    best_model = grid_search.best_estimator_
+    # A search on the same data, grid and strategy would pick the same parameters again
+    fingerprint = data_fingerprint(X, y)
+    search_key = hashlib.sha256(json.dumps([fingerprint, search, n_iter, PARAM_GRID]).encode()).hexdigest()
+    cached = load_search_cache().get(search_key) if use_cache else None
 
-    # Save the encoder
-    preprocessor = best_model.named_steps['preprocessor']
-    encoder = preprocessor.named_transformers_['cat']
-    joblib.dump(encoder, 'encoder.pkl')
+    started = time.perf_counter()
+    if cached:
+        print("Training data unchanged since the last search, reusing the cached hyperparameters.")
+        best_params, best_score = cached['best_params'], cached['best_score']
+        fold_scores = cached.get('fold_scores', [best_score])
+        best_model = build_pipeline(best_params)
+        best_model.fit(X, y)
+        timings['fit'] = time.perf_counter() - started
+    else:
+        # Implement the hyperparameter search with the preprocessor fit cached across candidates,
+        # in a directory that only lives as long as this search
+        with tempfile.TemporaryDirectory(prefix='pipeline_cache_') as cache_dir:
+            search_cv = make_search(build_pipeline(memory=cache_dir), search, n_iter)
+            search_cv.fit(X, y)
+        best_params, best_score = search_cv.best_params_, search_cv.best_score_
+        fold_scores = best_fold_scores(search_cv)
+        save_search_result(search_key, {
+            'strategy': search,
+            'best_params': best_params,
+            'best_score': float(best_score),
+            'fold_scores': fold_scores,
+            'rows': len(X),
+            'searched_at': datetime.now().isoformat(timespec='seconds')
+        })
 
-    # Save the model
-    joblib.dump(best_model, 'model.pkl')
+        # Best model from the search, already refitted on all rows
+        best_model = search_cv.best_estimator_
+        best_model.set_params(memory=None)
+        timings['search'] = time.perf_counter() - started
 
-    # Cross-validation scores
-    try:
-        scores = cross_val_score(best_model, X, y, cv=5,
-                                 scoring='neg_mean_squared_error')
-        print(f'Cross-Validation MSE Scores: {-scores}')
-        print(f'Average Cross-Validation MSE: {-scores.mean()}')
-    except ValueError as e:
-        print(f"Error during cross-validation: {e}")
+    # Cross-validation scores of the selected candidate
+    cv_mse = [-score for score in fold_scores]
+    print(f'Cross-Validation MSE Scores: {[round(mse, 2) for mse in cv_mse]}')
+    print(f'Average Cross-Validation MSE: {-best_score}')
 
-    # Train/test split and evaluate
+    # One holdout evaluation on a clone, the full-data model stays untouched
+    started = time.perf_counter()
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2,
                                                         random_state=42)
-    best_model.fit(X_train, y_train)
-    y_pred = best_model.predict(X_test)
-    print(f'Mean Squared Error: {mean_squared_error(y_test, y_pred)}')
-    print(f'R^2 Score: {r2_score(y_test, y_pred)}')
+    holdout_model = clone(best_model).fit(X_train, y_train)
+    y_pred = holdout_model.predict(X_test)
+    holdout_mse = mean_squared_error(y_test, y_pred)
+    holdout_r2 = r2_score(y_test, y_pred)
+    print(f'Mean Squared Error: {holdout_mse}')
+    print(f'R^2 Score: {holdout_r2}')
+    timings['holdout'] = time.perf_counter() - started
+
+    metrics = {
+        'cv_mse': float(-best_score),
+        'cv_fold_mse': cv_mse,
+        'holdout_mse': float(holdout_mse),
+        'holdout_r2': float(holdout_r2)
+    }
+
+    # Publish the model and encoder as a new version, the search result is kept for incremental updates
+    started = time.perf_counter()
+    now = datetime.now().isoformat(timespec='seconds')
+    encoder = best_model.named_steps['preprocessor'].named_transformers_['cat']
+    registry = ModelRegistry(registry_dir)
+    version = registry.publish(best_model, encoder, {
+        'trained_at': now,
+        'update': 'full',
+        'search': search,
+        'best_params': best_params,
+        'rows_trained': len(X),
+        'data_fingerprint': fingerprint,
+        'validation_mse': float(-best_score),
+        'full_search_at': now,
+        'metrics': metrics,
+        'timings': timings
+    })
+    registry.prune()
+    timings['save'] = time.perf_counter() - started
+
+    print(f"Model trained and saved successfully as {version}!")
+    print("Training time: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items()))
+    return dict(metrics, version=version, rows=len(X), timings=timings)
+
+def train_model_incremental(data_path=CLEANED_DATA_FILE, registry_dir=REGISTRY_DIR):
+    """Add trees for newly appended rows instead of searching and refitting from scratch.
 
-    print("Model trained and saved successfully!")
+    The fitted preprocessor and the last selected hyperparameters are reused;
+    the forest is grown with warm_start on the new rows only, so an update
+    costs the same however long the history is. A full grid search runs when
+    there is no previous model, when FULL_SEARCH_INTERVAL_DAYS have passed,
+    or when the error on the rows added since the last search drifts past
+    DRIFT_THRESHOLD times its validation error. That error is accumulated
+    across updates and only judged once it covers DRIFT_MIN_ROWS rows, so a
+    handful of unusual activities does not trigger a search.
+    """
+    registry = ModelRegistry(registry_dir)
+    state = registry.metadata()
+    if state is None:
+        print("No previous model found, running a full search.")
+        return train_model(data_path, registry_dir)
 
+    searched_at = datetime.fromisoformat(state['full_search_at'])
+    if datetime.now() - searched_at > timedelta(days=FULL_SEARCH_INTERVAL_DAYS):
+        print("Scheduled full hyperparameter search is due.")
+        return train_model(data_path, registry_dir)
 
-def update_data_and_train(new_data):
-    # Check if the CSV file exists
-    if os.path.isfile('cleaned_customers_data.csv'):
-        df = pd.read_csv('cleaned_customers_data.csv')
+    if not table_exists(data_path):
+        print(f"Data file '{data_path}' not found.")
+        return
+
+    started = time.perf_counter()
+    X, y = load_training_data(data_path)
+    if len(X) < state['rows_trained']:
+        print("Training data shrank since the last update, running a full search.")
+        return train_model(data_path, registry_dir)
+    X_new, y_new = X.iloc[state['rows_trained']:], y.iloc[state['rows_trained']:]
+    if X_new.empty:
+        print("No new data to train on.")
+        return
+
+    # A private, writable copy: the cached model may be serving predictions
+    model = registry.load_model(mmap=False, cache=False)
+    errors = (y_new.to_numpy() - model.predict(X_new)) ** 2
+    new_mse = float(errors.mean())
+    drift_rows = state.get('drift_rows', 0) + len(errors)
+    drift_squared_error = state.get('drift_squared_error', 0.0) + float(errors.sum())
+    drift_mse = drift_squared_error / drift_rows
+    if drift_rows >= DRIFT_MIN_ROWS and drift_mse > DRIFT_THRESHOLD * state['validation_mse']:
+        print(f"Error on the {drift_rows} rows since the last search ({drift_mse:.2f}) drifted past the threshold, "
+              "running a full search.")
+        return train_model(data_path, registry_dir)
+
+    regressor = model.named_steps['regressor']
+    if regressor.n_estimators + TREES_PER_UPDATE > MAX_TREES:
+        # Too many small trees: refit once on everything with the known parameters
+        model = build_pipeline(state['best_params'])
+        model.fit(X, y)
     else:
-        df = pd.DataFrame(columns=new_data.keys())
+        X_new_encoded = model.named_steps['preprocessor'].transform(X_new)
+        regressor.set_params(warm_start=True, n_estimators=regressor.n_estimators + TREES_PER_UPDATE)
+        regressor.fit(X_new_encoded, y_new)
 
-    # Append new data
-    df = df.append(new_data, ignore_index=True)
+    parent = state.pop('version')
+    version = registry.publish(model, model.named_steps['preprocessor'].named_transformers_['cat'], dict(
+        state,
+        trained_at=datetime.now().isoformat(timespec='seconds'),
+        update='incremental',
+        parent=parent,
+        rows_trained=len(X),
+        data_fingerprint=data_fingerprint(X, y),
+        new_rows_mse=new_mse,
+        drift_rows=drift_rows,
+        drift_squared_error=drift_squared_error,
+        timings={'update': time.perf_counter() - started}
+    ))
+    registry.prune()
+    print(f"Model updated to {version} with {len(X_new)} new rows (MSE on new rows before update: {new_mse:.2f}).")
 
-    # Save the updated DataFrame back to CSV
-    df.to_csv('cleaned_customers_data.csv', index=False)
+def update_data_and_train(new_data, data_path=CLEANED_DATA_FILE):
+    # Append the new rows to the CSV file, activity log or database table
+    write_table(pd.DataFrame([new_data] if isinstance(new_data, dict) else new_data), data_path)
 
     # Train the model with the updated data
-    train_model()
+    train_model(data_path)
 
 if __name__ == "__main__":
-    train_model()
+    if '--incremental' in sys.argv:
+        train_model_incremental()
+    elif '--halving' in sys.argv:
+        train_model(search='halving')
+    elif '--random' in sys.argv:
+        train_model(search='random')
+    else:
+        train_model()
@@ -0,0 +1,116 @@
+import multiprocessing
+import threading
+import time
+
+from cleaning_data import CLEANED_DATA_FILE, RAW_DATA_FILE, clean_data_incremental
+from model_registry import REGISTRY_DIR
+from training import train_model, train_model_incremental
+
+# Retrain once this many activities are pending...
+MIN_NEW_ROWS = 25
+# ...or once the oldest pending activity has waited this many seconds
+MAX_DELAY = 600
+# Wait for the counter to go quiet this long so a burst becomes a single retrain
+QUIET_PERIOD = 10
+
+def _train_worker(raw_path, data_path, registry_dir, incremental):
+    # Recorded activities reach the training data through the incremental clean
+    if raw_path:
+        clean_data_incremental(raw_path, data_path)
+    train = train_model_incremental if incremental else train_model
+    train(data_path, registry_dir=registry_dir)
+
+class TrainingScheduler:
+    """Debounced background retraining.
+
+    Recording an activity only calls notify(). A control thread waits until
+    enough rows are pending (or the oldest has waited long enough) and the
+    counter has been quiet for a moment, then, in a separate process, cleans
+    the newly recorded rows of raw_path into data_path and trains.
+    Rows recorded while a retrain is running are coalesced into the next one.
+    By default the worker runs train_model_incremental, which only falls
+    back to a full search when one is due.
+    Each retrain publishes a new registry version and swaps the CURRENT
+    pointer atomically, so readers always see a whole model.
+    """
+
+    def __init__(self, data_path=CLEANED_DATA_FILE, registry_dir=REGISTRY_DIR,
+                 min_new_rows=MIN_NEW_ROWS, max_delay=MAX_DELAY, quiet_period=QUIET_PERIOD,
+                 incremental=True, raw_path=RAW_DATA_FILE):
+        self.raw_path = raw_path
+        self.data_path = data_path
+        self.registry_dir = registry_dir
+        self.min_new_rows = min_new_rows
+        self.max_delay = max_delay
+        self.quiet_period = quiet_period
+        self.incremental = incremental
+
+        self.pending_rows = 0
+        self.first_pending = None
+        self.last_notify = None
+        self.force = False
+        self.stopped = False
+        self.process = None
+        self.condition = threading.Condition()
+        # Spawn keeps the worker clear of Tk and other state held by the parent
+        self.context = multiprocessing.get_context('spawn')
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def notify(self, new_rows=1):
+        """Tell the scheduler that new activities were recorded."""
+        with self.condition:
+            now = time.monotonic()
+            if self.pending_rows == 0:
+                self.first_pending = now
+            self.pending_rows += new_rows
+            self.last_notify = now
+            self.condition.notify()
+
+    def flush(self):
+        """Retrain as soon as possible if anything is pending."""
+        with self.condition:
+            self.force = True
+            self.condition.notify()
+
+    @property
+    def is_training(self):
+        return self.process is not None and self.process.is_alive()
+
+    def _due(self, now):
+        if self.pending_rows == 0:
+            return False
+        if self.force:
+            return True
+        threshold_reached = (self.pending_rows >= self.min_new_rows
+                             or now - self.first_pending >= self.max_delay)
+        return threshold_reached and now - self.last_notify >= self.quiet_period
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.stopped and not self._due(time.monotonic()):
+                    self.condition.wait(timeout=min(1.0, self.quiet_period))
+                if self.stopped and not (self.force and self.pending_rows):
+                    return
+                rows = self.pending_rows
+                self.pending_rows = 0
+                self.first_pending = None
+                self.force = False
+
+            print(f"Retraining the model in the background for {rows} new activities...")
+            self.process = self.context.Process(target=_train_worker,
+                                                args=(self.raw_path, self.data_path, self.registry_dir, self.incremental))
+            self.process.start()
+            self.process.join()
+            if self.process.exitcode != 0:
+                # Every retrain uses the full data file, so the next one still covers these rows
+                print(f"Background training failed (exit code {self.process.exitcode}).")
+
+    def shutdown(self, flush=True):
+        """Stop the scheduler, finishing any retrain that is running or (with flush) pending."""
+        with self.condition:
+            self.stopped = True
+            self.force = flush
+            self.condition.notify()
+        self.thread.join()
@@ -1,30 +1,21 @@
-import json
-import os
 import tkinter as tk
 from datetime import datetime
-from tkinter import messagebox, simpledialog, ttk
+from tkinter import messagebox, ttk
 
-import pandas as pd
 from PIL import Image, ImageTk
 
-import visualizing_data
-from collecting_data import record_activity
+import database
+from dashboard import open_dashboard
+from collecting_data import record_activities_bulk
+from pricing import SERVICES, load_price_book, requires_size
 from reporting import generate_report
 
-# File to store user credentials
-CREDENTIALS_FILE = "user_credentials.json"
-
-# Load user credentials from the file
+# User credentials: the users table when a database is selected, user_credentials.json otherwise
 def load_users():
-    if os.path.exists(CREDENTIALS_FILE):
-        with open(CREDENTIALS_FILE, "r") as file:
-            return json.load(file)
-    return {}
+    return database.load_credentials()
 
-# Save user credentials to the file
 def save_users(users):
-    with open(CREDENTIALS_FILE, "w") as file:
-        json.dump(users, file, indent=4)
+    database.save_credentials(users)
 
 def validate_date(date_str):
     try:
@@ -44,6 +35,7 @@ class LaundryManagementApp:
         self.loading_icon = self.load_image(r"C:\Users\Admin\Downloads\loading animation.webp")
 
         self.main_menu_frame = None
+        self.dashboard = None
         self.show_login_screen()
 
     def load_image(self, file_name):
@@ -85,8 +77,10 @@ class LaundryManagementApp:
         MainMenuFrame(self.root, self).pack(expand=True, fill=tk.BOTH)
 
     def clear_window(self):
+        # Separate windows (the dashboard, reports) outlive navigation in the main window
         for widget in self.root.winfo_children():
-            widget.destroy()
+            if not isinstance(widget, tk.Toplevel):
+                widget.destroy()
 
     def record_activity(self):
         self.show_loading_screen()
@@ -130,13 +124,19 @@ class LaundryManagementApp:
     def _visualize_data(self):
         self.hide_loading_screen()
         try:
-            period = simpledialog.askstring("Visualization", "Enter the period for visualization (daily/weekly/monthly/yearly):")
-            if period:
-                df = pd.read_csv('cleaned_customers_data.csv')
-                visualizing_data.visualize_data(df, period)
-                messagebox.showinfo("Success", "Data visualization successful!")
+            # One live dashboard window, kept open and updated as activities are recorded
+            if self.dashboard is not None and self.dashboard.winfo_exists():
+                self.dashboard.winfo_toplevel().lift()
+            else:
+                self.dashboard = open_dashboard(self.root)
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred while visualizing data: {e}")
+        finally:
+            MainMenuFrame(self.root, self).pack(expand=True, fill=tk.BOTH)
+
+    def activities_recorded(self, activities):
+        if self.dashboard is not None and self.dashboard.winfo_exists():
+            self.dashboard.add_activities(activities)
 
     def exit_app(self):
         self.root.quit()
@@ -210,6 +210,7 @@ class RecordActivityFrame(tk.Frame):
         super().__init__(parent)
         self.app = app
         self.configure(bg="#ecf0f1", padx=20, pady=20)
+        self.price_book = load_price_book()
         self.create_widgets()
 
     def create_widgets(self):
@@ -227,42 +228,79 @@ class RecordActivityFrame(tk.Frame):
         self.customer_name_entry = tk.Entry(frame)
         self.customer_name_entry.pack(pady=5)
 
+        tk.Label(frame, text="Customer Location:", bg="#bdc3c7").pack(pady=5)
+        self.customer_location_entry = tk.Entry(frame)
+        self.customer_location_entry.pack(pady=5)
+
+        tk.Label(frame, text="Customer Gender:", bg="#bdc3c7").pack(pady=5)
+        self.gender_combobox = ttk.Combobox(frame, values=["Male", "Female"], state="readonly")
+        self.gender_combobox.pack(pady=5)
+
         tk.Label(frame, text="Service:", bg="#bdc3c7").pack(pady=5)
-        self.service_combobox = ttk.Combobox(frame, values=["Duvet/Blanket", "Clothes", "Dry Cleaning", "Ironing"])
+        self.service_combobox = ttk.Combobox(frame, values=SERVICES, state="readonly")
         self.service_combobox.pack(pady=5)
+        self.service_combobox.bind("<<ComboboxSelected>>", self.update_amount)
 
         tk.Label(frame, text="Size:", bg="#bdc3c7").pack(pady=5)
-        self.size_combobox = ttk.Combobox(frame, values=["Small", "Medium", "Large"])
+        self.size_combobox = ttk.Combobox(frame, values=["Small", "Medium", "Large"], state="readonly")
         self.size_combobox.pack(pady=5)
+        self.size_combobox.bind("<<ComboboxSelected>>", self.update_amount)
+
+        self.ironing_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(frame, text="Ironing included", variable=self.ironing_var, command=self.update_amount,
+                       bg="#bdc3c7").pack(pady=5)
 
-        tk.Label(frame, text="Amount Paid:", bg="#bdc3c7").pack(pady=5)
-        self.amount_paid_entry = tk.Entry(frame)
-        self.amount_paid_entry.pack(pady=5)
+        # The amount is always quoted from the shared price list, never typed in
+        self.amount_label = tk.Label(frame, text="Amount: -", bg="#bdc3c7", font=("Helvetica", 12, "bold"))
+        self.amount_label.pack(pady=5)
 
         tk.Button(frame, text="Record", command=self.record, bg="#3498db", fg="white").pack(pady=10)
 
+    def update_amount(self, event=None):
+        service = self.service_combobox.get()
+        size = self.size_combobox.get() if requires_size(service) else ""
+        date = self.date_entry.get() if validate_date(self.date_entry.get()) else None
+        amount = self.price_book.price_one(service, size, self.ironing_var.get(), date)
+        self.amount_label.config(text=f"Amount: {amount}" if amount is not None else "Amount: -")
+
     def record(self):
         date = self.date_entry.get()
         customer_name = self.customer_name_entry.get().strip()
-        service = self.service_combobox.get().strip()
-        size = self.size_combobox.get().strip()
-        amount_paid = self.amount_paid_entry.get().strip()
+        customer_location = self.customer_location_entry.get().strip()
+        customer_gender = self.gender_combobox.get()
+        service = self.service_combobox.get()
+        size = self.size_combobox.get()
 
         if not validate_date(date):
             messagebox.showerror("Error", "Invalid date format. Please enter the date in YYYY-MM-DD format.")
             return
 
-        if not customer_name or not service or not size or not amount_paid:
+        if not customer_name or not customer_location or not customer_gender or not service:
             messagebox.showerror("Error", "All fields must be filled out.")
             return
 
-        try:
-            amount_paid = float(amount_paid)
-            record_activity(date, customer_name, service, size, amount_paid)
-            messagebox.showinfo("Success", "Activity recorded successfully!")
-            self.app.create_main_menu()
-        except ValueError:
-            messagebox.showerror("Error", "Amount paid must be a number.")
+        if requires_size(service) and not size:
+            messagebox.showerror("Error", "Please select a size for this service.")
+            return
+
+        activity = {
+            "Date": date,
+            "Customer Name": customer_name,
+            "Customer Location": customer_location,
+            "Customer Gender": customer_gender,
+            "Service": service,
+            "Size": size if requires_size(service) else "",
+            "Ironing": "yes" if self.ironing_var.get() else "no"
+        }
+        accepted, rejects = record_activities_bulk([activity])
+        if accepted is None or accepted.empty:
+            reason = rejects["Reason"].iloc[0] if rejects is not None and not rejects.empty else "The activity could not be saved."
+            messagebox.showerror("Error", reason)
+            return
+
+        self.app.activities_recorded(accepted)
+        messagebox.showinfo("Success", f"Activity recorded successfully! Amount: {accepted['Total Amount'].iloc[0]}")
+        self.app.create_main_menu()
 
 if __name__ == "__main__":
     root = tk.Tk()
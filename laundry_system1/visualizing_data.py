@@ -1,39 +1,170 @@
+import hashlib
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import joblib
+from activity_store import read_table
+from charts import (plot_bar_chart, plot_line_chart, plot_location_distribution, plot_pie_chart, plot_predicted_demand,
+                    plot_total_amount_over_time, render_chart, show_chart_file, use_agg_backend)
+from cleaning_data import CLEANED_DATA_FILE
+from date_slicing import slice_frame
+from disk_cache import DiskCache
+from downsampling import MAX_PLOT_BARS, MAX_PLOT_POINTS, downsample, downsample_groups, rebin
+from forecasting import FORECAST_DAYS, forecast_demand, predict_in_chunks
+from model_registry import load_current_model
+from periods import aggregate_by_period, period_rule
+from rollup import COUNT, RollupCube, load_rollup
+
+CHART_CACHE_DIR = '.chart_cache'
+CHART_CACHE_MAX_BYTES = 100 * 1024 * 1024
+CHART_CACHE_MAX_AGE = 7 * 24 * 3600
+# Fewer charts than this render in-process: starting spawn workers (about 2s) costs more than
+# drawing the standard set of eight downsampled charts (about 1s)
+POOL_MIN_CHARTS = 16
+
+chart_cache = DiskCache(CHART_CACHE_DIR, max_bytes=CHART_CACHE_MAX_BYTES, max_age=CHART_CACHE_MAX_AGE)
+
+def prepare_frame(df, start_date=None, end_date=None, locations=None):
+    # Dates are parsed once into a sorted index, so the range filter is a binary search
+    df = slice_frame(df, start_date, end_date, locations)
+    check_columns(df)  # Check for missing columns
+    return df
+
+def prepare_cube(df, start_date=None, end_date=None, cube=None, locations=None):
+    """The rollup the charts read: a slice of the given cube, or one built from df."""
+    if cube is None:
+        return RollupCube.from_frame(prepare_frame(df, start_date, end_date, locations))
+    if start_date or end_date or locations:
+        return cube.slice(start_date, end_date, locations)
+    return cube
+
+def chart_tasks(cube, period, output_dir='.', max_points=MAX_PLOT_POINTS, max_bars=MAX_PLOT_BARS):
+    """(plot function, args, kwargs) for every chart, so they can be drawn here or in a pool.
+
+    Every chart gets a small re-aggregation of the rollup cube rather than the transactions.
+    Time series are cut down to max_points points (LTTB) and daily bars are merged into
+    at most max_bars buckets, so render time does not grow with the history.
+    """
+    def path(filename):
+        return os.path.join(output_dir, filename)
+
+    daily_totals = cube.totals(['Date'])
+    daily = rebin(daily_totals[daily_totals.index.notna()], max_bars).reset_index()
+    daily['Date'] = daily['Date'].dt.date
+    daily_by_gender = downsample_groups(cube.totals(['Date', 'Customer Gender']).reset_index(),
+                                        'Date', 'Total Amount', 'Customer Gender', max_points)
+    return [
+        (plot_total_amount_over_time, (downsample(cube.period_totals(period), max_points), period), {'filename': path('total_amount_over_time.png')}),
+        (plot_pie_chart, (cube.totals(['Service'], COUNT), 'Service Distribution'), {'filename': path('service_distribution.png')}),
+        (plot_pie_chart, (cube.totals(['Customer Gender']), 'Spending Distribution by Gender'), {'filename': path('spending_by_gender.png')}),
+        (plot_bar_chart, (cube.totals(['Service', 'Customer Gender']).reset_index(), 'Service', 'Total Amount', 'Customer Gender', 'Total Amount of Services by Gender'), {'filename': path('services_by_gender.png')}),
+        (plot_bar_chart, (daily, 'Date', 'Total Amount', None, f'Total Amount Received Over Time ({period.capitalize()})'), {'filename': path('amount_received_over_time.png')}),
+        (plot_line_chart, (daily_by_gender, 'Date', 'Total Amount', 'Customer Gender', f'Price Comparison Between Genders Over Time ({period.capitalize()})'), {'filename': path('price_comparison_genders.png')}),
+        (plot_location_distribution, (cube.totals(['Customer Location'], COUNT),), {'filename': path('locations_served.png')})
+    ]
 
-def visualize_data(df, period='daily', start_date=None, end_date=None):
+def visualize_data(df, period='daily', start_date=None, end_date=None, cube=None, locations=None):
     try:
-        # Convert to datetime and filter by date range
-        df['Date'] = pd.to_datetime(df['Date'])
-        df['Total Amount'] = df['Total Amount'].astype(float)
-
-        if start_date and end_date:
-            df = df[(df['Date'] >= pd.to_datetime(start_date)) & (df['Date'] <= pd.to_datetime(end_date))]
-
-        check_columns(df)  # Check for missing columns
-
-        # Group data by period
-        df_grouped = group_by_period(df, period)
-
-        # Visualizations
-        plot_total_amount_over_time(df_grouped, period)
-        plot_pie_chart(df['Service'], 'Service Distribution', 'service_distribution.png')
-        plot_pie_chart(df.groupby('Customer Gender')['Total Amount'].sum(), 'Spending Distribution by Gender', 'spending_by_gender.png')
-        plot_bar_chart(df, 'Service', 'Total Amount', 'Customer Gender', 'Total Amount of Services by Gender', 'services_by_gender.png')
-        plot_bar_chart(df, df['Date'].dt.date, 'Total Amount', None, f'Total Amount Received Over Time ({period.capitalize()})', 'amount_received_over_time.png')
-        plot_line_chart(df, 'Date', 'Total Amount', 'Customer Gender', f'Price Comparison Between Genders Over Time ({period.capitalize()})', 'price_comparison_genders.png')
-        plot_location_distribution(df)
+        cube = prepare_cube(df, start_date, end_date, cube, locations)
+        if len(cube) == 0:
+            print("No activities match the given dates and locations.")
+            return
 
-        # Predictions
-        future_df = prepare_future_data(df)
-        predict_and_plot(future_df)
+        # Visualizations, then predictions
+        tasks = chart_tasks(cube, period)
+        tasks.append((plot_predicted_demand, (prepare_future_data(cube.segments()),), {'filename': 'predicted_demand_30_days.png'}))
+        for plot, args, kwargs in tasks:
+            # Charts rendered before from the same data are shown from the render cache, not redrawn
+            key, cached = restore_chart(plot, args, kwargs)
+            if cached:
+                show_chart_file(kwargs['filename'])
+            else:
+                store_chart(key, plot(*args, **kwargs))
 
         print("Data visualized and predictions displayed successfully!")
     except Exception as e:
         print(f"An error occurred while visualizing the data: {e}")
 
+def chart_fingerprint(plot, args, kwargs):
+    """Cache key for a chart: its type plus a hash of the data slice and labels, not the output path."""
+    parts = [plot.__name__]
+    for value in list(args) + [(key, kwargs[key]) for key in sorted(kwargs) if key != 'filename']:
+        if isinstance(value, (pd.Series, pd.DataFrame)):
+            digest = hashlib.sha256(pd.util.hash_pandas_object(value).values.tobytes()).hexdigest()
+            parts.append([digest, list(value.columns) if isinstance(value, pd.DataFrame) else value.name])
+        else:
+            parts.append(value)
+    return DiskCache.make_key(*parts)
+
+def restore_chart(plot, args, kwargs):
+    """(cache key, whether the chart was copied from the render cache to its filename)."""
+    key = chart_fingerprint(plot, args, kwargs)
+    cached = chart_cache.get(key, '.png')
+    if cached:
+        shutil.copyfile(cached, kwargs['filename'])
+    return key, bool(cached)
+
+def store_chart(key, path):
+    chart_cache.put(key, lambda tmp_path: shutil.copyfile(path, tmp_path), '.png')
+
+def render_charts(df, period='daily', start_date=None, end_date=None, output_dir='.',
+                  data_file=CLEANED_DATA_FILE, workers=None, forecast=True, cube=None, locations=None):
+    """Headless batch mode: render every chart to PNG without showing it.
+
+    Sets of POOL_MIN_CHARTS charts or more (or an explicit workers > 1) are
+    drawn in a process pool whose workers use the Agg backend, smaller sets
+    in-process. Every figure is closed once saved. Charts whose data slice
+    and labels were rendered before are copied from the render cache
+    instead of being redrawn.
+    Returns {chart path: render seconds} plus a 'total' entry with the
+    wall time of the whole batch.
+    """
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    cube = prepare_cube(df, start_date, end_date, cube, locations)
+    if len(cube) == 0:
+        print("No activities match the given dates and locations.")
+        return {'total': time.perf_counter() - started}
+    tasks = chart_tasks(cube, period, output_dir)
+    if forecast:
+        try:
+            tasks.append((plot_predicted_demand, (prepare_future_data(cube.segments(), data_file),),
+                          {'filename': os.path.join(output_dir, 'predicted_demand_30_days.png')}))
+        except FileNotFoundError as e:
+            print(f"Skipping the forecast chart: {e}")
+
+    timings = {}
+    pending = []
+    for plot, args, kwargs in tasks:
+        task_started = time.perf_counter()
+        key, cached = restore_chart(plot, args, kwargs)
+        if cached:
+            timings[kwargs['filename']] = time.perf_counter() - task_started
+        else:
+            pending.append((key, (plot, args, kwargs)))
+    if len(pending) < len(tasks):
+        print(f"{len(tasks) - len(pending)} of {len(tasks)} charts unchanged, served from the render cache.")
+
+    if workers is None:
+        workers = min(len(pending), os.cpu_count() or 1) if len(pending) >= POOL_MIN_CHARTS else 1
+    if pending and workers == 1:
+        for key, (plot, args, kwargs) in pending:
+            path, timings[kwargs['filename']] = render_chart(plot, args, kwargs)
+            store_chart(key, path)
+    elif pending:
+        # Spawned workers start clean instead of inheriting a GUI backend from the parent
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=use_agg_backend) as pool:
+            keys = [key for key, _ in pending]
+            for key, (path, seconds) in zip(keys, pool.map(render_chart, *zip(*[task for _, task in pending]))):
+                store_chart(key, path)
+                timings[path] = seconds
+    timings['total'] = time.perf_counter() - started
+    return timings
+
 def check_columns(df):
     required_columns = {'Customer Location', 'Customer Gender', 'Service', 'Size', 'Date', 'Day', 'Month', 'Year'}
     missing_columns = required_columns - set(df.columns)
@@ -41,132 +172,44 @@ def check_columns(df):
         raise ValueError(f"Columns are missing: {missing_columns}")
 
 def group_by_period(df, period):
-    if period == 'daily':
-        return df.groupby(df['Date'].dt.date)['Total Amount'].sum()
-    elif period == 'weekly':
-        return df.groupby(df['Date'].dt.to_period('W').apply(lambda r: r.start_time))['Total Amount'].sum()
-    elif period == 'monthly':
-        return df.groupby(df['Date'].dt.to_period('M').apply(lambda r: r.start_time))['Total Amount'].sum()
-    else:
-        raise ValueError("Invalid period specified. Choose from 'daily', 'weekly', or 'monthly'.")
-
-def plot_total_amount_over_time(df_grouped, period):
-    plt.figure(figsize=(12, 6))
-    plt.plot(df_grouped.index, df_grouped.values, marker='o', linestyle='-')
-    plt.title(f'Total Amount of Services Over Time ({period.capitalize()})')
-    plt.xlabel('Date')
-    plt.ylabel('Total Amount')
-    plt.grid(True)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig('total_amount_over_time.png')
-    plt.show()
-
-def plot_pie_chart(data, title, filename):
-    plt.figure(figsize=(8, 8))
-    data.value_counts().plot(kind='pie', autopct='%1.1f%%', startangle=140)
-    plt.title(title)
-    plt.ylabel('')
-    plt.savefig(filename)
-    plt.show()
-
-def plot_bar_chart(df, x, y, hue, title, filename):
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x=x, y=y, hue=hue, data=df, estimator=sum, errorbar=None)
-    plt.title(title)
-    plt.xlabel(x)
-    plt.ylabel(y)
-    plt.xticks(rotation=45)
-    plt.savefig(filename)
-    plt.show()
-
-def plot_line_chart(df, x, y, hue, title, filename):
-    plt.figure(figsize=(12, 6))
-    sns.lineplot(x=df[x].dt.date, y=y, hue=hue, data=df, estimator=sum, errorbar=None)
-    plt.title(title)
-    plt.xlabel(x)
-    plt.ylabel(y)
-    plt.xticks(rotation=45)
-    plt.savefig(filename)
-    plt.show()
-
-def plot_location_distribution(df):
-    plt.figure(figsize=(12, 6))
-    sns.countplot(data=df, x='Customer Location', order=df['Customer Location'].value_counts().index)
-    plt.title('Location Distribution')
-    plt.xlabel('Location')
-    plt.ylabel('Count')
-    plt.xticks(rotation=45)
-    plt.savefig('locations_served.png')
-    plt.show()
-
-def prepare_future_data(df):
-    model = joblib.load('model.pkl')
-    encoder = joblib.load('encoder.pkl')
-    locations_df = pd.read_csv('cleaned_customers_data.csv')
-    locations = locations_df['Customer Location'].unique()
-
-    future_dates = pd.date_range(start=df['Date'].max(), periods=30)
-    future_data = pd.DataFrame({'Date': future_dates})
-    future_data['Day'] = future_data['Date'].dt.day
-    future_data['Month'] = future_data['Date'].dt.month
-    future_data['Year'] = future_data['Date'].dt.year
-
-    service_types = df['Service'].unique()
-    sizes = ['Small', 'Medium', 'Large']
-    genders = df['Customer Gender'].unique()
-
-    prediction_data = [
-        {'Date': future_dates[0], 'Day': future_data['Day'].iloc[0], 'Month': future_data['Month'].iloc[0],
-         'Year': future_data['Year'].iloc[0], 'Service': service, 'Size': size, 'Customer Gender': gender,
-         'Customer Location': location}
-        for service in service_types
-        for size in sizes
-        for gender in genders
-        for location in locations
-    ]
+    """Total amount per period (daily/weekly/monthly/quarterly/yearly or an offset like '3D')."""
+    return aggregate_by_period(df, period)['Total Amount']
 
-    future_df = pd.DataFrame(prediction_data)
-
-    feature_names = encoder.get_feature_names_out()
-    future_df = pd.get_dummies(future_df, columns=['Service', 'Size', 'Customer Gender', 'Customer Location'])
-    missing_cols = set(feature_names) - set(future_df.columns)
-    for col in missing_cols:
-        future_df[col] = 0
-
-    return future_df[feature_names]
-
-def predict_and_plot(future_df):
-    model = joblib.load('model.pkl')
-    predictions = model.predict(future_df)
-    future_df['Predicted Amount'] = predictions
-
-    plt.figure(figsize=(12, 6))
-    plt.plot(future_df['Date'], future_df['Predicted Amount'], marker='o', linestyle='-')
-    plt.title('Predicted Demand Over the Next 30 Days')
-    plt.xlabel('Date')
-    plt.ylabel('Predicted Amount')
-    plt.grid(True)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig('predicted_demand_30_days.png')
-    plt.show()
-
-def main():
+def prepare_future_data(df, data_file=CLEANED_DATA_FILE):
+    """Forecast for the next FORECAST_DAYS days across every segment, from the forecast cache when possible."""
+    locations_df = read_table(data_file, columns=['Customer Location'])
+    return forecast_demand(df, FORECAST_DAYS, locations=locations_df['Customer Location'])
+
+def predict_and_plot(future_df, filename='predicted_demand_30_days.png', show=True):
+    if 'Predicted Amount' not in future_df.columns:
+        future_df['Predicted Amount'] = predict_in_chunks(load_current_model(), future_df)
+    return plot_predicted_demand(future_df, filename, show)
+
+def main(data_file=CLEANED_DATA_FILE):
     try:
-        df = pd.read_csv('cleaned_customers_data.csv')
-        period = input("Enter the period for visualization (daily/weekly/monthly): ").strip().lower()
+        period = input("Enter the period for visualization (daily/weekly/monthly/quarterly/yearly or e.g. 3D): ").strip().lower()
 
-        if period not in ['daily', 'weekly', 'monthly']:
-            print("Invalid period. Please choose from 'daily', 'weekly', or 'monthly'.")
+        try:
+            period_rule(period)
+        except ValueError as e:
+            print(e)
             return
 
-        start_date = None
-        end_date = None
+        start_date = input("Enter the start date (YYYY-MM-DD) or leave blank: ").strip() or None
+        end_date = input("Enter the end date (YYYY-MM-DD) or leave blank: ").strip() or None
+        location = input("Enter a location to show or leave blank for all: ").strip() or None
 
-        visualize_data(df, period, start_date, end_date)
+        visualize_data(None, period, start_date, end_date, cube=load_rollup(data_file), locations=location)
     except Exception as e:
         print(f"An error occurred: {e}")
 
 if __name__ == "__main__":
-    main()
+    if '--headless' in sys.argv:
+        # Nightly chart set without a display: python visualizing_data.py --headless [period]
+        args = [arg for arg in sys.argv[1:] if arg != '--headless']
+        timings = render_charts(None, args[0] if args else 'daily', output_dir='visualizations',
+                                cube=load_rollup(CLEANED_DATA_FILE))
+        for path, seconds in timings.items():
+            print(f"{path}: {seconds:.2f}s")
+    else:
+        main()